@@ -1,8 +1,9 @@
 from django.contrib import admin
 
-from .models import Email, UserProfile, File, Team
+from .models import Email, UserProfile, File, Team, ImportJob
 
 admin.site.register(Email)
 admin.site.register(UserProfile)
 admin.site.register(File)
-admin.site.register(Team)
\ No newline at end of file
+admin.site.register(Team)
+admin.site.register(ImportJob)
\ No newline at end of file
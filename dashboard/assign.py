@@ -0,0 +1,271 @@
+import logging
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q, QuerySet
+
+from .canonical import canonical_email
+from .counters import recount
+from .ingest import iter_batches
+from .models import AdminEmail, ManagerEmail, TLEmail
+
+logger = logging.getLogger(__name__)
+
+ASSIGN_CHUNK_SIZE = 5000
+
+# ManagerEmail fields carried over to the TL's copy
+TL_COPY_FIELDS = (
+    'gmail_id', 'password', 'recovery_email', 'two_fa_code', 'two_fa_link', 'provider', 'status',
+    'problem_reason', 'last_checked', 'last_login', 'closure_status', 'closure_requested_at', 'notes',
+    'created_at', 'code', 'file_id', 'source_file_id',
+)
+
+
+def _same_address(model):
+    return model.objects.filter(
+        Q(gmail_id=OuterRef('gmail_id')) | Q(canonical_gmail_id=OuterRef('canonical_gmail_id'))
+    )
+
+
+def _manager_copy_sql():
+    """
+    ``INSERT … SELECT`` copying unassigned AdminEmail rows into ManagerEmail.
+
+    Rows whose address (exact or canonical) is already in ManagerEmail are anti-joined
+    away; ``ON CONFLICT DO NOTHING`` covers a concurrent assignment of the same address.
+    Parameters: the team id, then the AdminEmail ids.
+    """
+    qn = connection.ops.quote_name
+    admin_columns = {field.column for field in AdminEmail._meta.concrete_fields}
+    targets, values = [], []
+    for field in ManagerEmail._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        targets.append(qn(field.column))
+        if field.name == 'team':
+            values.append('%s')
+        elif field.name == 'is_assigned':
+            values.append('FALSE')
+        elif field.column in admin_columns:
+            values.append(f'a.{qn(field.column)}')
+        else:
+            values.append('NULL')
+
+    admin, manager = qn(AdminEmail._meta.db_table), qn(ManagerEmail._meta.db_table)
+    return (
+        f"INSERT INTO {manager} ({', '.join(targets)}) "
+        f"SELECT {', '.join(values)} FROM {admin} a "
+        f"WHERE a.id IN ({{ids}}) AND a.team_id IS NULL AND NOT EXISTS ("
+        f"SELECT 1 FROM {manager} m WHERE m.gmail_id = a.gmail_id OR m.canonical_gmail_id = a.canonical_gmail_id"
+        f") ON CONFLICT DO NOTHING"
+    )
+
+
+def _id_chunks(selection, chunk_size):
+    """Chunks of AdminEmail ids from a list of ids or, keyset-paginated, from a queryset."""
+    if not isinstance(selection, QuerySet):
+        yield from iter_batches(sorted(set(map(int, selection))), chunk_size)
+        return
+
+    ids = selection.order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while True:
+        chunk = list(ids.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def assign_to_team(selection, team, chunk_size=ASSIGN_CHUNK_SIZE):
+    """
+    Copy the selected AdminEmail rows into ``team``'s ManagerEmail table, set-based.
+
+    ``selection`` is a list of AdminEmail ids or an AdminEmail queryset (e.g. from
+    ``selection.select_admin_emails``), which is read id-chunk by id-chunk and never
+    loaded whole.
+
+    Each chunk of ids costs two statements however many rows it holds: one read that
+    classifies the rows that will be skipped, and one ``INSERT … SELECT``. Everything
+    runs in one transaction. Returns ``{'assigned', 'skipped_present', 'other_team'}``
+    counts: rows copied, rows already in this team, rows held by another team.
+    """
+    counts = {'assigned': 0, 'skipped_present': 0, 'other_team': 0}
+    sql = _manager_copy_sql()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for chunk in _id_chunks(selection, chunk_size):
+            skipped = (
+                AdminEmail.objects.filter(id__in=chunk)
+                .annotate(
+                    in_team=Exists(_same_address(ManagerEmail).filter(team=team)),
+                    in_manager=Exists(_same_address(ManagerEmail)),
+                )
+                .filter(Q(team__isnull=False) | Q(in_manager=True))
+                .values_list('team_id', 'in_team')
+            )
+            for team_id, in_team in skipped:
+                if team_id == team.id or (team_id is None and in_team):
+                    counts['skipped_present'] += 1
+                else:
+                    counts['other_team'] += 1
+
+            with recount('manager', ManagerEmail.objects.filter(gmail_id__in=AdminEmail.objects.filter(id__in=chunk).values('gmail_id'))):
+                cursor.execute(sql.format(ids=', '.join(['%s'] * len(chunk))), [team.id, *chunk])
+            counts['assigned'] += cursor.rowcount
+
+    logger.info(f"Assigned {counts['assigned']} emails to team {team.name}: {counts}")
+    return counts
+
+
+def iter_unassigned_manager_emails(team, chunk_size=ASSIGN_CHUNK_SIZE):
+    """Yield chunks of the team's unassigned ManagerEmail rows, keyset-paginated on id."""
+    queryset = ManagerEmail.objects.filter(team=team, is_assigned=False).order_by('id').only('id', *TL_COPY_FIELDS)
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def assign_to_tls(team, scheduler, chunk_size=ASSIGN_CHUNK_SIZE):
+    """
+    Hand the team's unassigned ManagerEmail rows to TLs picked by ``scheduler``.
+
+    Only rows with ``is_assigned=False`` are read, so the cost follows the number of
+    new emails rather than the team's backlog. Per chunk: one read of the TLEmail
+    rows already present, one ``bulk_create``, one re-read of what landed and one
+    ``update()`` flipping ``is_assigned``. Rows already held by a TL, of this team or
+    another, are marked assigned too, so no later run reads them again. Returns ``{'assigned', 'skipped_present', 'no_tl',
+    'at_capacity'}`` counts.
+    """
+    counts = {'assigned': 0, 'skipped_present': 0, 'no_tl': 0, 'at_capacity': 0}
+
+    for chunk in iter_unassigned_manager_emails(team, chunk_size):
+        matched = [email for email in chunk if scheduler.has_provider(email.provider)]
+        counts['no_tl'] += len(chunk) - len(matched)
+        if not matched:
+            continue
+
+        gmail_ids = [email.gmail_id for email in matched]
+        with transaction.atomic(), recount('tl', TLEmail.objects.filter(gmail_id__in=gmail_ids)):
+            present = set(TLEmail.objects.filter(gmail_id__in=gmail_ids).values_list('gmail_id', flat=True))
+            new_emails = []
+            for email in matched:
+                if email.gmail_id in present:
+                    continue
+                tl = scheduler.pick(email.provider)
+                if tl is None:
+                    counts['at_capacity'] += 1
+                    continue
+                new_emails.append(TLEmail(
+                    **{name: getattr(email, name) for name in TL_COPY_FIELDS},
+                    canonical_gmail_id=canonical_email(email.gmail_id),
+                    new_password='',
+                    team=team,
+                    assigned_to=tl,
+                ))
+            TLEmail.objects.bulk_create(new_emails, batch_size=1000, ignore_conflicts=True)
+            held = dict(TLEmail.objects.filter(gmail_id__in=gmail_ids).values_list('gmail_id', 'team_id'))
+            ManagerEmail.objects.filter(id__in=[email.id for email in matched if email.gmail_id in held]).update(is_assigned=True)
+
+        counts['assigned'] += sum(1 for gmail_id, team_id in held.items() if team_id == team.id and gmail_id not in present)
+        counts['skipped_present'] += len(present)
+
+    logger.info(f"Assigned {counts['assigned']} emails to TLs of team {team.name}: {counts}")
+    return counts
+
+
+def _copy_to_tl(emails, tl):
+    return [
+        TLEmail(
+            **{name: getattr(email, name) for name in TL_COPY_FIELDS},
+            canonical_gmail_id=canonical_email(email.gmail_id),
+            new_password='',
+            team_id=tl.team_id,
+            assigned_to=tl,
+        )
+        for email in emails
+    ]
+
+
+def _claim_rows_skip_locked(queryset, limit, tl):
+    """Lock up to ``limit`` rows other claimers are not holding, then flip them; must run in a transaction."""
+    emails = list(queryset.select_for_update(skip_locked=True)[:limit])
+    ManagerEmail.objects.filter(id__in=[email.id for email in emails]).update(is_assigned=True, assigned_to=tl)
+    return emails
+
+
+def _claim_rows_conditional(queryset, limit, tl):
+    """
+    Fallback for databases without SKIP LOCKED (SQLite): claim row by row with a
+    conditional UPDATE, as ``jobs.claim_next_job`` does, so a row lost to another
+    claimer is just passed over. Candidates are read in id order until ``limit``
+    rows are claimed or none are left. Each UPDATE commits on its own.
+    """
+    emails = []
+    last_id = 0
+    while len(emails) < limit:
+        candidates = list(queryset.filter(id__gt=last_id)[:limit - len(emails)])
+        if not candidates:
+            break
+        for email in candidates:
+            if ManagerEmail.objects.filter(id=email.id, is_assigned=False).update(is_assigned=True, assigned_to=tl):
+                emails.append(email)
+        last_id = candidates[-1].id
+    return emails
+
+
+def _land(emails, tl):
+    """
+    Copy claimed ManagerEmail rows into TLEmail for ``tl`` and return the new rows.
+
+    A row whose address some TL got first is dropped by ``ignore_conflicts``; its
+    ManagerEmail claim is released, so only rows that landed stay assigned.
+    """
+    gmail_ids = [email.gmail_id for email in emails]
+    with transaction.atomic():
+        with recount('tl', TLEmail.objects.filter(gmail_id__in=gmail_ids)):
+            TLEmail.objects.bulk_create(_copy_to_tl(emails, tl), batch_size=1000, ignore_conflicts=True)
+        claimed = list(TLEmail.objects.filter(gmail_id__in=gmail_ids, assigned_to=tl).order_by('id'))
+        landed = {email.gmail_id for email in claimed}
+        ManagerEmail.objects.filter(id__in=[email.id for email in emails if email.gmail_id not in landed]).update(
+            is_assigned=False, assigned_to=None
+        )
+    return claimed
+
+
+def claim_for_tl(tl, limit):
+    """
+    Atomically move up to ``limit`` unassigned ManagerEmail rows of the TL's team and
+    provider into TLEmail for ``tl`` and return the new TLEmail rows.
+
+    On PostgreSQL the rows are taken with ``SELECT … FOR UPDATE SKIP LOCKED``, so TLs
+    claiming at the same time each get different rows without waiting on each
+    other. A TL with a ``tl_capacity`` never claims past it.
+    """
+    if tl.tl_capacity is not None:
+        limit = min(limit, tl.tl_capacity - TLEmail.objects.filter(assigned_to=tl, status='working').count())
+    if limit <= 0 or not tl.team_id or not tl.tl_provider:
+        return []
+
+    queryset = (
+        ManagerEmail.objects.filter(team_id=tl.team_id, is_assigned=False, provider__iexact=tl.tl_provider)
+        .exclude(Exists(TLEmail.objects.filter(gmail_id=OuterRef('gmail_id'))))  # Already held by a TL
+        .order_by('id')
+        .only('id', *TL_COPY_FIELDS)
+    )
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            claimed = _land(_claim_rows_skip_locked(queryset, limit, tl), tl)
+    else:
+        emails = _claim_rows_conditional(queryset, limit, tl)
+        try:
+            claimed = _land(emails, tl)
+        except Exception:
+            ManagerEmail.objects.filter(id__in=[email.id for email in emails]).update(is_assigned=False, assigned_to=None)
+            raise
+
+    logger.info(f"TL {tl.id} claimed {len(claimed)} emails")
+    return claimed
@@ -0,0 +1,75 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .versions import current, team_scope
+
+CACHE_ALIAS = 'dashboard'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _count(outcome):
+    cache = _cache()
+    key = f'stats:{outcome}'
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+
+def cache_stats():
+    """``{'hits', 'misses'}`` since the cache was last cleared."""
+    cache = _cache()
+    return {'hits': cache.get('stats:hit', 0), 'misses': cache.get('stats:miss', 0)}
+
+
+def request_version(request, scope):
+    """``versions.current(scope)``, read once per request so the ETag and the cache key agree."""
+    versions = request.__dict__.setdefault('_dashboard_versions', {})
+    if scope not in versions:
+        versions[scope] = current(scope)
+    return versions[scope]
+
+
+def data_etag(request, endpoint, version, *parts):
+    """
+    Strong ETag for a JSON endpoint: the endpoint, a change marker such as the
+    scope's version, ``parts`` (e.g. the TL profile id) and the query string.
+    Nothing is read from the page itself.
+    """
+    key = ':'.join(str(part) for part in (endpoint, version, *parts, request.GET.urlencode()))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def cached_response(request, endpoint, team_id, build, assignee_id=None):
+    """
+    Serve a JSON endpoint from the dashboard cache.
+
+    The key is the endpoint, team, assignee, query string and the team's current
+    version, which every write to the team's rows advances (see ``versions.bump``);
+    ``build()`` runs on a miss and only 200 responses are stored. The
+    ``X-Dashboard-Cache`` header says whether the page was a HIT or a MISS.
+    """
+    cache = _cache()
+    query = hashlib.sha1(request.GET.urlencode().encode()).hexdigest()
+    key = f'page:{endpoint}:{team_id}:{assignee_id}:{request_version(request, team_scope(team_id))}:{query}'
+
+    content = cache.get(key)
+    if content is not None:
+        _count('hit')
+        response = HttpResponse(content, content_type='application/json')
+        response['X-Dashboard-Cache'] = 'HIT'
+        return response
+
+    _count('miss')
+    response = build()
+    if response.status_code == 200:
+        cache.set(key, response.content, timeout=settings.DASHBOARD_CACHE_TIMEOUT)
+    response['X-Dashboard-Cache'] = 'MISS'
+    return response
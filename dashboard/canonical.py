@@ -0,0 +1,50 @@
+import numpy as np
+
+# Domains that deliver to the same mailbox
+DOMAIN_ALIASES = {
+    'googlemail.com': 'gmail.com',
+}
+
+# Providers that ignore dots in the local part
+DOTLESS_DOMAINS = {'gmail.com'}
+
+# Sub-address separator per provider (john+news@gmail.com is john@gmail.com). Yahoo's
+# name-keyword addresses are separate disposable mailboxes, so Yahoo is left out.
+SUBADDRESS_SEPARATORS = {
+    'gmail.com': '+',
+    'outlook.com': '+',
+    'hotmail.com': '+',
+    'live.com': '+',
+}
+
+
+def canonical_email(address):
+    """
+    Return the provider-aware canonical form of ``address`` used for deduplication.
+
+    Addresses are lower-cased; for providers that deliver ``John.Doe+x@Gmail.com``
+    to ``johndoe@gmail.com`` the dots and the sub-address are folded away too. A bare
+    name without ``@`` is read as a Gmail local part, matching provider inference.
+    """
+    if address is None:
+        return None
+    address = str(address).strip().lower()
+    if not address:
+        return None
+
+    local, at, domain = address.rpartition('@')
+    if not at:
+        local, domain = address, 'gmail.com'
+    domain = DOMAIN_ALIASES.get(domain, domain)
+
+    separator = SUBADDRESS_SEPARATORS.get(domain)
+    if separator and separator in local[1:]:
+        local = local[:local.index(separator, 1)]
+    if domain in DOTLESS_DOMAINS:
+        local = local.replace('.', '')
+    return f"{local}@{domain}"
+
+
+def canonical_column(gmail_ids):
+    """Canonicalize a column of addresses (a ``RowBatch`` column or any iterable)."""
+    return np.array([canonical_email(gmail_id) for gmail_id in gmail_ids], dtype=object)
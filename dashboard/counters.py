@@ -0,0 +1,146 @@
+import logging
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import EmailCounter
+from .stages import STAGE_MODELS
+from .versions import bump, stage_scopes
+
+logger = logging.getLogger(__name__)
+
+# Per stage: the lookup giving the assignee's UserProfile id and the provider column, if any
+KEY_FIELDS = {
+    'admin': (None, 'provider'),
+    'manager': (None, 'provider'),
+    'tl': ('assigned_to', 'provider'),
+    'closed': ('assigned_to__userprofile', None),  # ClosedEmail points at the User
+}
+
+
+def tally(stage, queryset):
+    """Count ``queryset``'s rows per counter key with one GROUP BY; returns a ``Counter``."""
+    assignee, provider = KEY_FIELDS[stage]
+    fields = ['team', 'status', *(name for name in (assignee, provider) if name)]
+    counts = Counter()
+    for row in queryset.order_by().values(*fields).annotate(rows=Count('pk')):
+        key = (
+            row['team'] or 0,
+            (row[assignee] or 0) if assignee else 0,
+            row['status'],
+            (row[provider] or '').lower() if provider else '',
+        )
+        counts[key] += row['rows']
+    return counts
+
+
+def apply_deltas(stage, deltas):
+    """Add ``{key: delta}`` to the stage's counters: one insert of missing keys, then one UPDATE per key."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    EmailCounter.objects.bulk_create(
+        [
+            EmailCounter(stage=stage, team_id=team_id, assignee_id=assignee_id, status=status, provider=provider)
+            for team_id, assignee_id, status, provider in deltas
+        ],
+        ignore_conflicts=True,
+    )
+    for (team_id, assignee_id, status, provider), delta in deltas.items():
+        EmailCounter.objects.filter(
+            stage=stage, team_id=team_id, assignee_id=assignee_id, status=status, provider=provider
+        ).update(count=F('count') + delta)
+
+
+def add(stage, queryset):
+    """Count freshly written rows and bump their versions; call in the transaction that wrote them."""
+    counts = tally(stage, queryset)
+    apply_deltas(stage, counts)
+    bump(stage_scopes(stage, (team_id for team_id, _, _, _ in counts)))
+
+
+def _lock(queryset):
+    # FOR UPDATE cannot share a statement with the tally's GROUP BY, so lock first, in id order
+    list(queryset.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+
+@contextmanager
+def recount(stage, queryset):
+    """
+    Keep the counters right across a write to the rows of ``queryset``.
+
+    The rows are tallied before and after the block and the difference applied, all
+    in one transaction, so inserts, status changes and reassignments are covered
+    alike. The existing rows are locked before the first tally, so a concurrent
+    writer to them waits instead of changing them between the two tallies.
+    ``queryset`` must select the same rows on both sides, e.g. by id or gmail_id,
+    not by a column the block changes. The dashboard version of every scope the
+    rows belong to, before or after, is bumped in the same transaction.
+    """
+    with transaction.atomic():
+        _lock(queryset)
+        before = tally(stage, queryset)
+        yield
+        after = tally(stage, queryset)
+        bump(stage_scopes(stage, (team_id for team_id, _, _, _ in set(before) | set(after))))
+        after.subtract(before)
+        apply_deltas(stage, after)
+
+
+def delete_counted(stage, queryset):
+    """``queryset.delete()`` with the counters decremented and versions bumped in the same transaction."""
+    with transaction.atomic():
+        _lock(queryset)
+        removed = tally(stage, queryset)
+        result = queryset.delete()
+        apply_deltas(stage, {key: -rows for key, rows in removed.items()})
+        bump(stage_scopes(stage, (team_id for team_id, _, _, _ in removed)))
+    return result
+
+
+def _counters(stage, team=None, assignee=None, status=None):
+    counters = EmailCounter.objects.filter(stage=stage)
+    if team is not None:
+        counters = counters.filter(team_id=team.id)
+    if assignee is not None:
+        counters = counters.filter(assignee_id=assignee.id)
+    if status is not None:
+        counters = counters.filter(status__in=[status] if isinstance(status, str) else status)
+    return counters
+
+
+def counted_total(stage, team=None, assignee=None, status=None):
+    """Row count for a dashboard from the counters table instead of a COUNT(*) over the stage table."""
+    return _counters(stage, team, assignee, status).aggregate(total=Sum('count'))['total'] or 0
+
+
+def counted_providers(stage, providers, team=None, assignee=None, status=None):
+    """``{provider: rows}`` for ``providers`` (lowercase names) in one lookup."""
+    counts = dict.fromkeys(providers, 0)
+    counts.update(
+        _counters(stage, team, assignee, status).filter(provider__in=providers)
+        .values_list('provider').annotate(total=Sum('count'))
+    )
+    return counts
+
+
+def rebuild_counters():
+    """
+    Recompute every counter from the stage tables, replacing what is there.
+
+    One GROUP BY per stage table, in one transaction. Returns ``{stage: rows_counted}``.
+    """
+    counted = {}
+    with transaction.atomic():
+        EmailCounter.objects.all().delete()
+        for stage, model in STAGE_MODELS.items():
+            counts = tally(stage, model.objects.all())
+            EmailCounter.objects.bulk_create([
+                EmailCounter(stage=stage, team_id=team_id, assignee_id=assignee_id, status=status, provider=provider, count=rows)
+                for (team_id, assignee_id, status, provider), rows in counts.items()
+            ])
+            counted[stage] = sum(counts.values())
+            logger.info(f"Counters rebuilt: {counted[stage]} {stage} rows")
+    return counted
@@ -0,0 +1,68 @@
+import logging
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+
+from .canonical import canonical_column
+from .counters import recount
+from .models import AdminEmail
+from .stages import find_in_stages
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def iter_batches(rows, size=BATCH_SIZE):
+    """Group an iterable of rows into lists of at most ``size`` rows."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ingest_admin_batches(batches, file_instance, source_file_id, seen_emails, batch_size=BATCH_SIZE):
+    """
+    Bulk-import normalized ``RowBatch`` chunks of AdminEmail fields for one uploaded file.
+
+    Each batch is deduplicated by canonical address against the current upload
+    (``seen_emails``, shared across files) and against existing AdminEmail rows with
+    a single ``find_in_stages`` lookup, then written with one ``bulk_create``. The
+    whole file is imported in one transaction, together with its counter updates. Returns ``(imported_count,
+    duplicate_emails)``; ``file_instance.count`` is updated with the exact number of
+    rows that landed in the table.
+    """
+    duplicate_emails = set()
+
+    with transaction.atomic(), recount('admin', AdminEmail.objects.filter(file=file_instance)):
+        for batch in batches:
+            gmail_ids = batch['gmail_id']
+            canonicals = canonical_column(gmail_ids)
+            existing = find_in_stages(canonicals, stages=('admin',), canonical=True)
+
+            keep = []
+            for gmail_id, canonical in zip(gmail_ids, canonicals):
+                if canonical in seen_emails or canonical in existing:
+                    duplicate_emails.add(gmail_id)
+                    keep.append(False)
+                else:
+                    seen_emails.add(canonical)
+                    keep.append(True)
+
+            keep = np.array(keep, dtype=bool)
+            new_emails = [
+                AdminEmail(**row, canonical_gmail_id=canonical, team=None, file=file_instance, source_file_id=source_file_id)
+                for row, canonical in zip(batch.take(keep).records(), canonicals[keep])
+            ]
+            AdminEmail.objects.bulk_create(new_emails, batch_size=batch_size, ignore_conflicts=True)
+
+        # ignore_conflicts hides rows lost to a concurrent import, so count what actually landed.
+        imported_count = AdminEmail.objects.filter(file=file_instance).count()
+        file_instance.count = imported_count
+        file_instance.save(update_fields=['count'])
+
+    logger.info(f"Bulk imported {imported_count} emails for file {file_instance.file_name}, {len(duplicate_emails)} duplicates")
+    return imported_count, duplicate_emails
@@ -0,0 +1,300 @@
+import io
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .ingest import BATCH_SIZE, ingest_admin_batches
+from .models import File, ImportDuplicate, ImportJob
+from .normalize import ADMIN_IMPORT, normalize_rows
+from .readers import read_upload
+
+logger = logging.getLogger(__name__)
+
+
+def _stale_cutoff():
+    return timezone.now() - timedelta(seconds=settings.IMPORT_JOB_TIMEOUT)
+
+
+def find_previous_import(checksum):
+    """
+    Return the earliest ``File`` or in-flight ``ImportJob`` whose upload had the
+    same bytes, or ``None``. Running jobs past ``IMPORT_JOB_TIMEOUT`` don't count.
+    """
+    if not checksum:
+        return None
+    previous = File.objects.filter(checksum=checksum).order_by('id').first()
+    if previous is None:
+        previous = ImportJob.objects.filter(
+            Q(status='queued') | Q(status='running', started_at__gte=_stale_cutoff()), checksum=checksum
+        ).order_by('id').first()
+    return previous
+
+
+def enqueue_import(upload, file_id, source, user=None, checksum=None):
+    """Store an uploaded file and queue it for the import worker."""
+    job = ImportJob(
+        file_name=upload.name,
+        source=source,
+        source_file_id=int(file_id),
+        checksum=checksum,
+        created_by=user,
+    )
+    job.upload.save(upload.name, upload, save=False)
+    job.save()
+    logger.info(f"Queued import job {job.id} for {job.file_name}")
+    return job
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to running and return it, or ``None``.
+
+    The claim is a conditional UPDATE, so several workers can poll the same table
+    without a broker and without picking up the same job twice.
+    """
+    for job_id in ImportJob.objects.filter(status='queued').order_by('id').values_list('id', flat=True)[:10]:
+        claimed = ImportJob.objects.filter(id=job_id, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        if claimed:
+            return ImportJob.objects.get(id=job_id)
+    return None
+
+
+def fail_stale_jobs():
+    """
+    Fail running jobs started more than ``IMPORT_JOB_TIMEOUT`` seconds ago, whose
+    worker must have died, and drop their stored uploads. Returns the number failed.
+    """
+    failed = 0
+    for job in ImportJob.objects.filter(status='running', started_at__lt=_stale_cutoff()):
+        # Conditional on started_at, so a job another worker just failed is not counted twice
+        if ImportJob.objects.filter(id=job.id, status='running', started_at=job.started_at).update(
+            status='failed', error='The import worker stopped before finishing; please upload the file again.',
+            finished_at=timezone.now(), upload=''
+        ):
+            logger.warning(f"Import job {job.id} for {job.file_name} timed out in 'running' and was marked failed")
+            job.upload.delete(save=False)
+            failed += 1
+    return failed
+
+
+def claim_jobs(limit):
+    """Claim up to ``limit`` queued jobs, oldest (i.e. first uploaded) first, after failing stale ones."""
+    fail_stale_jobs()
+    jobs = []
+    while len(jobs) < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        jobs.append(job)
+    return jobs
+
+
+def parse_batches(source, file_name):
+    """Read and normalize one upload as a lazy stream of ``RowBatch`` chunks."""
+    header, rows = read_upload(source, file_name, ADMIN_IMPORT.header_keywords)
+    yield from normalize_rows(header, rows, ADMIN_IMPORT)
+
+
+def spool_upload(source, file_name, job_id, progress):
+    """
+    Parse one upload in a pool process, pickling each batch into a temp file as it
+    is normalized and reporting ``(job_id, rows_read, rows_kept)`` on ``progress``.
+
+    Returns the spool path. Runs in a pool process, so it must not touch the database.
+    """
+    spool = tempfile.NamedTemporaryFile(prefix='import-', suffix='.batches', delete=False)
+    try:
+        with spool:
+            for batch in parse_batches(source, file_name):
+                pickle.dump(batch, spool, protocol=pickle.HIGHEST_PROTOCOL)
+                progress.put((job_id, batch.rows_read, len(batch)))
+    except BaseException:
+        os.remove(spool.name)
+        raise
+    return spool.name
+
+
+def read_spool(path):
+    """Stream the batches written by ``spool_upload`` back, one at a time."""
+    with open(path, 'rb') as spool:
+        while True:
+            try:
+                yield pickle.load(spool)
+            except EOFError:
+                return
+
+
+def _upload_source(job):
+    try:
+        return job.upload.path
+    except NotImplementedError:
+        # Remote storage: hand the parser the bytes instead of a path
+        with job.upload.open('rb') as upload:
+            return io.BytesIO(upload.read())
+
+
+def _counted(job, batches):
+    """Pass ``batches`` through, totalling ``job.rows_parsed`` and ``job.rows_failed`` (saved by ``write_job``)."""
+    job.rows_parsed = job.rows_failed = 0
+    for batch in batches:
+        job.rows_parsed += batch.rows_read
+        job.rows_failed += batch.rows_read - len(batch)
+        yield batch
+
+
+def _add_progress(job_id, rows_read, rows_kept):
+    ImportJob.objects.filter(id=job_id).update(
+        rows_parsed=F('rows_parsed') + rows_read, rows_failed=F('rows_failed') + rows_read - rows_kept
+    )
+
+
+def _record_progress(progress):
+    """Apply the ``(job_id, rows_read, rows_kept)`` reports waiting on ``progress``, one UPDATE each."""
+    while True:
+        try:
+            report = progress.get_nowait()
+        except queue.Empty:
+            return
+        _add_progress(*report)
+
+
+class _DirectProgress:
+    """``progress`` for ``spool_upload`` run in this process: each report is saved as it comes."""
+
+    def put(self, report):
+        _add_progress(*report)
+
+
+def _fail_job(job, error):
+    logger.error(f"Import job {job.id} failed for {job.file_name}: {error}")
+    ImportJob.objects.filter(id=job.id).update(status='failed', error=str(error), finished_at=timezone.now())
+
+
+def parse_jobs(jobs, processes=None):
+    """
+    Parse the uploads of ``jobs`` in parallel, one pool process per file, each
+    into a spool file of pickled batches so no process holds a whole file.
+
+    ``rows_parsed``/``rows_failed`` are updated after every batch while the pool
+    runs. Returns ``{job.id: spool_path}`` for the jobs that parsed; jobs that
+    failed are marked as such. The caller removes the spool files.
+    """
+    spools = {}
+    processes = processes or settings.IMPORT_WORKER_PROCESSES or os.cpu_count()
+    connections.close_all()  # Never share a database connection with forked children
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as pool:
+        progress = manager.Queue()
+        futures = {
+            pool.submit(spool_upload, _upload_source(job), job.file_name, job.id, progress): job for job in jobs
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            _record_progress(progress)
+            for future in done:
+                job = futures[future]
+                try:
+                    spools[job.id] = future.result()
+                except Exception as e:
+                    _fail_job(job, e)
+        _record_progress(progress)
+    return spools
+
+
+def parse_job(job):
+    """
+    Parse a lone job's upload in this process into a spool file, as ``parse_jobs``
+    does in the pool, saving progress after every batch. Returns ``{job.id: spool_path}``,
+    or ``{}`` with the job marked failed.
+    """
+    try:
+        return {job.id: spool_upload(_upload_source(job), job.file_name, job.id, _DirectProgress())}
+    except Exception as e:
+        _fail_job(job, e)
+        return {}
+
+
+def write_job(job, batches, seen_emails):
+    """
+    Bulk-insert a job's ``RowBatch`` stream in one transaction and mark it done.
+
+    ``batches`` may be a lazy parse of the upload; a parse error fails the job
+    like a write error does.
+    """
+    try:
+        with transaction.atomic():
+            if not ImportJob.objects.select_for_update().filter(id=job.id, status='running').exists():
+                # Failed by fail_stale_jobs while this worker was still busy with it
+                logger.warning(f"Import job {job.id} is no longer running; its rows were not written")
+                return
+            job.file = File.objects.create(
+                file_name=job.file_name,
+                date=timezone.now(),
+                count=0,
+                source=job.source,
+                checksum=job.checksum
+            )
+            imported_count, duplicate_emails = ingest_admin_batches(
+                _counted(job, batches), job.file, job.source_file_id, seen_emails
+            )
+            job.rows_imported = imported_count
+            job.rows_duplicated = len(duplicate_emails)
+            ImportDuplicate.objects.bulk_create(
+                [ImportDuplicate(job=job, gmail_id=gmail_id) for gmail_id in sorted(duplicate_emails)],
+                batch_size=BATCH_SIZE
+            )
+            job.status = 'done'
+            job.finished_at = timezone.now()
+            job.save()
+        logger.info(f"Import job {job.id}: imported {imported_count} emails from {job.file_name}")
+    except Exception as e:
+        _fail_job(job, e)
+
+
+def process_queued_jobs(limit=None, processes=None):
+    """
+    Run queued jobs until the queue is empty; returns the number processed.
+
+    Each round claims every waiting job, parses the files in parallel and then
+    writes them one by one in upload order with a shared ``seen_emails`` set, so
+    an address that appears in several files is always kept from the first one.
+    A lone job is parsed in this process instead of the pool. Either way
+    ``rows_parsed`` moves while the file is parsed, before the write transaction.
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        jobs = claim_jobs(settings.IMPORT_WORKER_BATCH if limit is None else min(settings.IMPORT_WORKER_BATCH, limit - processed))
+        if not jobs:
+            break
+        spools = {}
+        try:
+            spools = parse_job(jobs[0]) if len(jobs) == 1 else parse_jobs(jobs, processes)
+            seen_emails = set()
+            for job in jobs:
+                if job.id in spools:
+                    write_job(job, read_spool(spools[job.id]), seen_emails)
+        except Exception as e:
+            # Don't leave the round's unfinished jobs 'running' until IMPORT_JOB_TIMEOUT
+            for job in ImportJob.objects.filter(id__in=[job.id for job in jobs], status='running'):
+                _fail_job(job, e)
+            raise
+        finally:
+            for path in spools.values():
+                os.remove(path)
+            for job in jobs:
+                job.upload.delete(save=False)
+            ImportJob.objects.filter(id__in=[job.id for job in jobs]).update(upload='')
+        processed += len(jobs)
+    return processed
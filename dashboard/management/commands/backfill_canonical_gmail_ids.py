@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.canonical import canonical_email
+from dashboard.stages import STAGE_MODELS
+
+
+class Command(BaseCommand):
+    help = "Fill canonical_gmail_id for every stage table, in id order and in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows read and updated per round trip.')
+        parser.add_argument('--all', action='store_true', help='Recompute rows that already have a canonical id.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for stage, model in STAGE_MODELS.items():
+            queryset = model.objects.order_by('id')
+            if not options['all']:
+                queryset = queryset.filter(canonical_gmail_id__isnull=True)
+
+            updated = 0
+            last_id = 0
+            while True:
+                rows = list(queryset.filter(id__gt=last_id).only('id', 'gmail_id')[:batch_size])
+                if not rows:
+                    break
+                for row in rows:
+                    row.canonical_gmail_id = canonical_email(row.gmail_id)
+                model.objects.bulk_update(rows, ['canonical_gmail_id'])
+                updated += len(rows)
+                last_id = rows[-1].id
+            self.stdout.write(f"{stage}: {updated} row(s) updated")
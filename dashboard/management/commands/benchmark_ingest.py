@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from dashboard.ingest import ingest_admin_batches
+from dashboard.models import AdminEmail, File
+from dashboard.normalize import ADMIN_IMPORT, normalize_rows
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare rows/sec of the per-row admin import against the bulk ingest engine (no data is kept)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Number of synthetic rows to import.')
+        parser.add_argument('--duplicates', type=float, default=0.1, help='Fraction of rows that repeat an earlier address.')
+
+    def handle(self, *args, **options):
+        rows = self._make_rows(options['rows'], options['duplicates'])
+        self.stdout.write(f"Benchmarking {len(rows)} rows against the {AdminEmail._meta.db_table} table")
+
+        legacy = self._timed(self._legacy_import, rows)
+        bulk = self._timed(self._bulk_import, rows)
+
+        self.stdout.write(f"per-row : {legacy:8.2f}s  {len(rows) / legacy:10.0f} rows/sec")
+        self.stdout.write(f"bulk    : {bulk:8.2f}s  {len(rows) / bulk:10.0f} rows/sec")
+        self.stdout.write(self.style.SUCCESS(f"speedup : {legacy / bulk:.1f}x"))
+
+    def _make_rows(self, count, duplicate_ratio):
+        unique = max(1, int(count * (1 - duplicate_ratio)))
+        return [
+            (f"bench.user{i % unique}@gmail.com", f"pass{i}", f"recovery{i}@yahoo.com", 'gmail', 1.5)
+            for i in range(count)
+        ]
+
+    def _timed(self, func, rows):
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                func(rows)
+                raise _Rollback
+        except _Rollback:
+            pass
+        return time.perf_counter() - start
+
+    def _legacy_import(self, rows):
+        # Mirrors the original admin_dashboard loop: one exists() and one create() per row.
+        file_instance = File.objects.create(file_name='benchmark-legacy.xlsx', source='A')
+        for gmail_id, password, recovery_email, provider, price in rows:
+            if not AdminEmail.objects.filter(gmail_id=gmail_id).exists():
+                AdminEmail.objects.create(
+                    gmail_id=gmail_id, password=password, recovery_email=recovery_email,
+                    provider=provider, price=price, team=None, file=file_instance, source_file_id=1
+                )
+
+    def _bulk_import(self, rows):
+        file_instance = File.objects.create(file_name='benchmark-bulk.xlsx', source='A')
+        ingest_admin_batches(normalize_rows(None, iter(rows), ADMIN_IMPORT), file_instance, 1, set())
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.propagation import PROPAGATION_BATCH_SIZE, propagate_statuses
+
+
+class Command(BaseCommand):
+    help = "Carry TL status changes logged since the last run onto manager emails, then manager changes onto admin emails."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PROPAGATION_BATCH_SIZE, help='Status events read per round trip.')
+
+    def handle(self, *args, **options):
+        changed = propagate_statuses(batch_size=options['batch_size'])
+        for stage, count in changed.items():
+            self.stdout.write(f"{stage}: {count} row(s) changed")
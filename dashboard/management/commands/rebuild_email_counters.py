@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the email_counters table from the admin, manager, TL and closed tables."
+
+    def handle(self, *args, **options):
+        counted = rebuild_counters()
+        for stage, count in counted.items():
+            self.stdout.write(f"{stage}: {count} row(s) counted")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.jobs import process_queued_jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued spreadsheet imports. Polls the import_jobs table, so no broker is needed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--processes', type=int, default=None, help='Parser processes (defaults to IMPORT_WORKER_PROCESSES).')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Import worker started")
+        while True:
+            processed = process_queued_jobs(processes=options['processes'])
+            if processed:
+                self.stdout.write(f"Processed {processed} import job(s)")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
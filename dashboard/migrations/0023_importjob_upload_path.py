@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:49
+
+import dashboard.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0022_importjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='upload',
+            field=models.FileField(blank=True, upload_to=dashboard.uploads.import_upload_path),
+        ),
+    ]
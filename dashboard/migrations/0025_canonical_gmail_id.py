@@ -0,0 +1,69 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:52
+
+from django.db import migrations, models
+
+STAGE_MODELS = ('AdminEmail', 'ManagerEmail', 'TLEmail', 'ClosedEmail')
+
+
+def canonical_email(address):
+    # Frozen copy of dashboard.canonical.canonical_email as of this migration
+    if address is None:
+        return None
+    address = str(address).strip().lower()
+    if not address:
+        return None
+    local, at, domain = address.rpartition('@')
+    if not at:
+        local, domain = address, 'gmail.com'
+    domain = {'googlemail.com': 'gmail.com'}.get(domain, domain)
+    separator = {'gmail.com': '+', 'outlook.com': '+', 'hotmail.com': '+', 'live.com': '+'}.get(domain)
+    if separator and separator in local[1:]:
+        local = local[:local.index(separator, 1)]
+    if domain == 'gmail.com':
+        local = local.replace('.', '')
+    return f"{local}@{domain}"
+
+
+def backfill(apps, schema_editor, batch_size=1000):
+    for name in STAGE_MODELS:
+        model = apps.get_model('dashboard', name)
+        last_id = 0
+        while True:
+            rows = list(model.objects.filter(id__gt=last_id).order_by('id').only('id', 'gmail_id')[:batch_size])
+            if not rows:
+                break
+            for row in rows:
+                row.canonical_gmail_id = canonical_email(row.gmail_id)
+            model.objects.bulk_update(rows, ['canonical_gmail_id'])
+            last_id = rows[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0024_file_checksum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adminemail',
+            name='canonical_gmail_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='closedemail',
+            name='canonical_gmail_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='manageremail',
+            name='canonical_gmail_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='tlemail',
+            name='canonical_gmail_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
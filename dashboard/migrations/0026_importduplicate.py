@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_duplicate_lists(apps, schema_editor):
+    ImportJob = apps.get_model('dashboard', 'ImportJob')
+    ImportDuplicate = apps.get_model('dashboard', 'ImportDuplicate')
+    for job in ImportJob.objects.exclude(duplicate_emails=[]).only('id', 'duplicate_emails').iterator():
+        ImportDuplicate.objects.bulk_create(
+            [ImportDuplicate(job_id=job.id, gmail_id=gmail_id) for gmail_id in job.duplicate_emails],
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0025_canonical_gmail_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportDuplicate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gmail_id', models.CharField(max_length=255)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicates', to='dashboard.importjob')),
+            ],
+            options={
+                'db_table': 'import_duplicates',
+            },
+        ),
+        migrations.RunPython(copy_duplicate_lists, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='importjob',
+            name='duplicate_emails',
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0027_userprofile_tl_weight_capacity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('stage', models.CharField(choices=[('admin', 'Admin'), ('manager', 'Manager'), ('tl', 'TL'), ('closed', 'Closed')], max_length=20)),
+                ('email_id', models.IntegerField()),
+                ('gmail_id', models.CharField(max_length=255)),
+                ('old_status', models.CharField(blank=True, max_length=20, null=True)),
+                ('new_status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_events', to=settings.AUTH_USER_MODEL)),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_events', to='dashboard.team')),
+            ],
+            options={
+                'db_table': 'status_events',
+                'indexes': [models.Index(fields=['team', 'id'], name='status_event_team_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:07
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Frozen copy of dashboard.counters.KEY_FIELDS and rebuild_counters as of this migration:
+# per stage, the model, the assignee's UserProfile id lookup and the provider column
+STAGES = {
+    'admin': ('AdminEmail', None, 'provider'),
+    'manager': ('ManagerEmail', None, 'provider'),
+    'tl': ('TLEmail', 'assigned_to', 'provider'),
+    'closed': ('ClosedEmail', 'assigned_to__userprofile', None),
+}
+
+
+def rebuild(apps, schema_editor):
+    EmailCounter = apps.get_model('dashboard', 'EmailCounter')
+    EmailCounter.objects.all().delete()
+    for stage, (name, assignee, provider) in STAGES.items():
+        fields = ['team', 'status', *(field for field in (assignee, provider) if field)]
+        counts = {}
+        for row in apps.get_model('dashboard', name).objects.order_by().values(*fields).annotate(rows=Count('pk')):
+            key = (
+                row['team'] or 0,
+                (row[assignee] or 0) if assignee else 0,
+                row['status'],
+                (row[provider] or '').lower() if provider else '',
+            )
+            counts[key] = counts.get(key, 0) + row['rows']
+        EmailCounter.objects.bulk_create([
+            EmailCounter(stage=stage, team_id=team_id, assignee_id=assignee_id, status=status, provider=provider, count=rows)
+            for (team_id, assignee_id, status, provider), rows in counts.items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0028_statusevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('admin', 'Admin'), ('manager', 'Manager'), ('tl', 'TL'), ('closed', 'Closed')], max_length=20)),
+                ('team_id', models.IntegerField(default=0)),
+                ('assignee_id', models.IntegerField(default=0)),
+                ('status', models.CharField(max_length=20)),
+                ('provider', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'email_counters',
+                'constraints': [models.UniqueConstraint(fields=('stage', 'team_id', 'assignee_id', 'status', 'provider'), name='email_counter_key')],
+            },
+        ),
+        migrations.RunPython(rebuild, migrations.RunPython.noop),
+    ]
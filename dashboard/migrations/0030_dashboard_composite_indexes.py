@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0029_emailcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adminemail',
+            index=models.Index(fields=['source_file_id', 'id'], name='admin_email_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='closedemail',
+            index=models.Index(fields=['team', 'assigned_to', 'status', 'source_file_id', 'id'], name='closed_email_owner_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='closedemail',
+            index=models.Index(fields=['team', 'assigned_to', 'source_file_id', 'id'], name='closed_email_owner_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='manageremail',
+            index=models.Index(fields=['team', 'source_file_id', 'id'], name='manager_email_team_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='manageremail',
+            index=models.Index(fields=['team', 'status', 'source_file_id', 'id'], name='manager_email_team_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tlemail',
+            index=models.Index(fields=['team', 'assigned_to', 'status', 'source_file_id', 'id'], name='tl_email_owner_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tlemail',
+            index=models.Index(fields=['team', 'assigned_to', 'source_file_id', 'id'], name='tl_email_owner_source_idx'),
+        ),
+    ]
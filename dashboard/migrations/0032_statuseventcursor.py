@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0031_dashboardversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusEventCursor',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'status_event_cursors',
+            },
+        ),
+    ]
@@ -1,12 +1,28 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .canonical import canonical_email
+from .uploads import import_upload_path
+
+
+class CanonicalGmailMixin:
+    """Keeps ``canonical_gmail_id`` in step with ``gmail_id`` on every ``save()``."""
+
+    def save(self, *args, **kwargs):
+        self.canonical_gmail_id = canonical_email(self.gmail_id)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'gmail_id' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'canonical_gmail_id'}
+        super().save(*args, **kwargs)
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     is_admin = models.BooleanField(default=False)
     team = models.ForeignKey('Team', on_delete=models.SET_NULL, null=True, blank=True) 
     role = models.CharField(max_length=20, choices=[('manager', 'Manager'), ('tl', 'TL')], default='tl')
     tl_provider = models.CharField(max_length=50, choices=[('gmail', 'Gmail'), ('hotmail', 'Hotmail'), ('yahoo', 'Yahoo')], null=True, blank=True) 
+    tl_weight = models.PositiveIntegerField(default=1)  # Share of new work relative to the team's other TLs
+    tl_capacity = models.PositiveIntegerField(null=True, blank=True)  # Max open (working) emails; empty means no cap
 
     def __str__(self):
         return f"{self.user.username} - {'Admin' if self.is_admin else 'Team Member'}"
@@ -17,10 +33,48 @@ class File(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     count = models.IntegerField(default=0)
     source = models.CharField(max_length=1, choices=[('A', 'A'), ('B', 'B'), ('C', 'C')], default='A')
+    checksum = models.CharField(max_length=64, blank=True, null=True, db_index=True)  # SHA-256 of the uploaded bytes
 
     def __str__(self):
         return f"{self.file_name} ({self.source})"
 
+class ImportJob(models.Model):
+    STATUS_CHOICES = [('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')]
+
+    file_name = models.CharField(max_length=255)
+    source = models.CharField(max_length=1, choices=[('A', 'A'), ('B', 'B'), ('C', 'C')], default='A')
+    source_file_id = models.IntegerField()
+    upload = models.FileField(upload_to=import_upload_path, blank=True)
+    checksum = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    file = models.ForeignKey(File, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    rows_parsed = models.IntegerField(default=0)
+    rows_imported = models.IntegerField(default=0)
+    rows_duplicated = models.IntegerField(default=0)
+    rows_failed = models.IntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'import_jobs'
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+class ImportDuplicate(models.Model):
+    """An uploaded address an import job skipped as a duplicate; kept out of the status JSON."""
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name='duplicates')
+    gmail_id = models.CharField(max_length=255)
+
+    class Meta:
+        db_table = 'import_duplicates'
+
+    def __str__(self):
+        return self.gmail_id
+
 # Placeholder for original Email model (can be removed later after migration)
 class Email(models.Model):
     id = models.AutoField(primary_key=True)
@@ -52,9 +106,10 @@ class Email(models.Model):
         return self.gmail_id
 
 # New table for Admin dashboard
-class AdminEmail(models.Model):
+class AdminEmail(CanonicalGmailMixin, models.Model):
     id = models.AutoField(primary_key=True)
     gmail_id = models.CharField(max_length=255, null=False, unique=True)  # Unique to avoid duplicates
+    canonical_gmail_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)  # See canonical.canonical_email
     password = models.CharField(max_length=255, blank=True, null=True)
     recovery_email = models.EmailField(max_length=255, blank=True, null=True)
     two_fa_code = models.CharField(max_length=255, blank=True, null=True)
@@ -76,14 +131,19 @@ class AdminEmail(models.Model):
 
     class Meta:
         db_table = 'admin_emails'
+        indexes = [
+            # Admin dashboard and get_emails: optional source file filter, ordered by (source_file_id, id)
+            models.Index(fields=['source_file_id', 'id'], name='admin_email_source_idx'),
+        ]
 
     def __str__(self):
         return self.gmail_id
 
 # New table for Manager dashboard
-class ManagerEmail(models.Model):
+class ManagerEmail(CanonicalGmailMixin, models.Model):
     id = models.AutoField(primary_key=True)
     gmail_id = models.CharField(max_length=255, null=False, unique=True)  # Unique to avoid duplicates
+    canonical_gmail_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)  # See canonical.canonical_email
     password = models.CharField(max_length=255, blank=True, null=True)
     recovery_email = models.EmailField(max_length=255, blank=True, null=True)
     two_fa_code = models.CharField(max_length=255, blank=True, null=True)
@@ -107,14 +167,20 @@ class ManagerEmail(models.Model):
 
     class Meta:
         db_table = 'manager_emails'
+        indexes = [
+            # team_dashboard_data: team, then optional source file or status, ordered by (source_file_id, id)
+            models.Index(fields=['team', 'source_file_id', 'id'], name='manager_email_team_source_idx'),
+            models.Index(fields=['team', 'status', 'source_file_id', 'id'], name='manager_email_team_status_idx'),
+        ]
 
     def __str__(self):
         return self.gmail_id
 
 # New table for TL dashboard
-class TLEmail(models.Model):
+class TLEmail(CanonicalGmailMixin, models.Model):
     id = models.AutoField(primary_key=True)
     gmail_id = models.CharField(max_length=255, null=False, unique=True)  # Unique to avoid duplicates
+    canonical_gmail_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)  # See canonical.canonical_email
     password = models.CharField(max_length=255, blank=True, null=True)
     recovery_email = models.EmailField(max_length=255, blank=True, null=True)
     two_fa_code = models.CharField(max_length=255, blank=True, null=True)
@@ -137,12 +203,18 @@ class TLEmail(models.Model):
 
     class Meta:
         db_table = 'tl_emails'
+        indexes = [
+            # tl_dashboard_data: the TL's rows, optionally by status or source file, in (source_file_id, id) order
+            models.Index(fields=['team', 'assigned_to', 'status', 'source_file_id', 'id'], name='tl_email_owner_status_idx'),
+            models.Index(fields=['team', 'assigned_to', 'source_file_id', 'id'], name='tl_email_owner_source_idx'),
+        ]
 
     def __str__(self):
         return self.gmail_id
 
-class ClosedEmail(models.Model):
+class ClosedEmail(CanonicalGmailMixin, models.Model):
     gmail_id = models.CharField(max_length=255, unique=True)  # Unique to prevent duplicates
+    canonical_gmail_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)  # See canonical.canonical_email
     password = models.CharField(max_length=255, blank=True)
     recovery_email = models.CharField(max_length=255, blank=True, null=True)
     new_password = models.CharField(max_length=255, blank=True, null=True)
@@ -157,6 +229,72 @@ class ClosedEmail(models.Model):
     class Meta:
         verbose_name = "Closed Email"
         verbose_name_plural = "Closed Emails"
+        indexes = [
+            # closed_emails_data: the user's rows, optionally by status, in (source_file_id, id) order
+            models.Index(fields=['team', 'assigned_to', 'status', 'source_file_id', 'id'], name='closed_email_owner_status_idx'),
+            models.Index(fields=['team', 'assigned_to', 'source_file_id', 'id'], name='closed_email_owner_source_idx'),
+        ]
+
+# The four pipeline stages, one per *Email table
+STAGE_CHOICES = [('admin', 'Admin'), ('manager', 'Manager'), ('tl', 'TL'), ('closed', 'Closed')]
+
+# Append-only log of status changes, read incrementally by id
+class StatusEvent(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES)
+    email_id = models.IntegerField()  # Row id in the stage's table
+    gmail_id = models.CharField(max_length=255)
+    team = models.ForeignKey('Team', on_delete=models.SET_NULL, null=True, blank=True, related_name='status_events')
+    old_status = models.CharField(max_length=20, blank=True, null=True)
+    new_status = models.CharField(max_length=20)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='status_events')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'status_events'
+        indexes = [models.Index(fields=['team', 'id'], name='status_event_team_idx')]
+
+    def __str__(self):
+        return f"{self.gmail_id}: {self.old_status} -> {self.new_status}"
+
+# How far a consumer of status_events has read; see propagation.py
+class StatusEventCursor(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    last_event_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'status_event_cursors'
+
+    def __str__(self):
+        return f"{self.name}: {self.last_event_id}"
+
+# Row counts per (stage, team, assignee, status, provider), kept in step by every writer; see counters.py
+class EmailCounter(models.Model):
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES)
+    team_id = models.IntegerField(default=0)  # Plain ids with 0 for "none", so the key never holds a NULL
+    assignee_id = models.IntegerField(default=0)  # UserProfile id
+    status = models.CharField(max_length=20)
+    provider = models.CharField(max_length=50, blank=True, default='')  # Lowercased
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'email_counters'
+        constraints = [
+            models.UniqueConstraint(fields=['stage', 'team_id', 'assignee_id', 'status', 'provider'], name='email_counter_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.stage}/{self.team_id}/{self.assignee_id}/{self.status}/{self.provider}: {self.count}"
+
+class DashboardVersion(models.Model):
+    scope = models.CharField(max_length=50, primary_key=True)  # 'admin' or 'team:<id>'
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'dashboard_versions'
+
+    def __str__(self):
+        return f"{self.scope}: {self.version}"
 
 class Team(models.Model):
     TEAM_CHOICES = (
@@ -0,0 +1,151 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .ingest import BATCH_SIZE, iter_batches
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    """
+    How an upload's columns map onto model fields.
+
+    ``roles`` is an ordered list of ``(field, keyword)`` pairs; a header column takes
+    the first role whose keyword appears in its lower-cased name (spaces read as
+    underscores). ``positional`` lists the fields of a header-less sheet, column by
+    column; leave it empty when a header is required.
+    """
+    roles: tuple
+    header_keywords: tuple
+    positional: tuple = ()
+    numeric: tuple = ()
+    infer_provider: bool = False
+    fields: tuple = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'fields', tuple(dict.fromkeys(name for name, _ in self.roles)))
+
+
+ADMIN_IMPORT = ImportSpec(
+    roles=(
+        ('gmail_id', 'gmail'),
+        ('password', 'pass'),
+        ('recovery_email', 'recover'),
+        ('provider', 'provid'),
+        ('price', 'price'),
+    ),
+    header_keywords=('gmail', 'email', 'gmail_id', 'password', 'recovery', 'provider', 'price'),
+    positional=('gmail_id', 'password', 'recovery_email', 'provider', 'price'),
+    numeric=('price',),
+    infer_provider=True,
+)
+
+CLOSED_IMPORT = ImportSpec(
+    roles=(
+        ('gmail_id', 'gmail'),
+        ('new_password', 'new_pass'),
+        ('password', 'pass'),
+        ('recovery_email', 'recover'),
+    ),
+    header_keywords=('gmail', 'email', 'gmail_id', 'password', 'recover', 'new_password'),
+    positional=('gmail_id', 'password', 'recovery_email', 'new_password'),
+)
+
+TL_IMPORT = ImportSpec(
+    roles=(
+        ('gmail_id', 'gmail'),
+        ('new_password', 'new_pass'),
+    ),
+    header_keywords=('gmail id', 'new password', 'password', 'gmail', 'gmail_id', 'new_password'),
+)
+
+
+class RowBatch:
+    """
+    A chunk of normalized rows stored column-wise as NumPy object arrays.
+
+    ``rows_read`` is the number of raw rows the chunk came from, including rows
+    that were dropped during normalization.
+    """
+
+    def __init__(self, columns, rows_read=None):
+        self.columns = columns
+        self.rows_read = len(self) if rows_read is None else rows_read
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def take(self, mask):
+        return RowBatch({name: values[mask] for name, values in self.columns.items()}, self.rows_read)
+
+    def records(self):
+        names = list(self.columns)
+        for values in zip(*self.columns.values()):
+            yield dict(zip(names, values))
+
+
+def map_columns(header, spec):
+    """Resolve each field of ``spec`` to a column index, once per file."""
+    if header is None:
+        return {name: index for index, name in enumerate(spec.positional)}
+
+    mapping = {}
+    for index, col in enumerate(header):
+        col_key = str(col).lower().replace(' ', '_')
+        for name, keyword in spec.roles:
+            if keyword in col_key:
+                mapping[name] = index  # Later columns win, as in the original per-row loop
+                break
+    return mapping
+
+
+def _text_column(frame, index):
+    if index is None or index not in frame:
+        return np.full(len(frame), '', dtype=object)
+    column = frame[index]
+    return column.where(column.notna(), '').astype(str).str.strip().to_numpy(dtype=object)
+
+
+def _numeric_column(frame, index):
+    if index is None or index not in frame:
+        return np.full(len(frame), None, dtype=object)
+    values = pd.to_numeric(frame[index], errors='coerce')
+    return values.astype(object).where(values.notna(), None).to_numpy(dtype=object)
+
+
+def _infer_provider(gmail_ids, providers):
+    gmail = pd.Series(gmail_ids, dtype=object)
+    domain = gmail.str.rsplit('@', n=1).str[-1].str.split('.').str[0].str.lower()
+    inferred = np.where(gmail.str.contains('@', regex=False), domain, 'gmail')
+    return np.where(providers == '', inferred, providers).astype(object)
+
+
+def normalize_rows(header, rows, spec, batch_size=BATCH_SIZE):
+    """
+    Turn raw row tuples into ``RowBatch`` chunks with whole-column operations.
+
+    Text columns are stripped with blanks as ``''``, numeric columns are coerced with
+    invalid values as ``None``, the provider is inferred from the address domain when
+    missing, and rows without a ``gmail_id`` are dropped.
+    """
+    mapping = map_columns(header, spec)
+    if 'gmail_id' not in mapping:
+        return
+
+    for chunk in iter_batches(rows, batch_size):
+        frame = pd.DataFrame.from_records(chunk)
+        columns = {}
+        for name in spec.fields:
+            if name in spec.numeric:
+                columns[name] = _numeric_column(frame, mapping.get(name))
+            else:
+                columns[name] = _text_column(frame, mapping.get(name))
+        if spec.infer_provider:
+            columns['provider'] = _infer_provider(columns['gmail_id'], columns['provider'])
+
+        batch = RowBatch(columns)
+        yield batch.take(batch['gmail_id'] != '')
@@ -0,0 +1,120 @@
+import base64
+import json
+
+# Default page size in cursor mode, matching the page-number mode of the dashboards
+CURSOR_PAGE_SIZE = 10
+# Largest page a client can ask for with ?page_size=
+MAX_PAGE_SIZE = 500
+# Always selected by ?fields=: the sort key cursors are built from, and the id writes refer to
+KEY_COLUMNS = ('id', 'source_file_id')
+
+
+def page_size(request, default=CURSOR_PAGE_SIZE):
+    """``?page_size=`` capped at ``MAX_PAGE_SIZE``; a missing or invalid value gives ``default``."""
+    value = request.GET.get('page_size', '')
+    if not value.isdigit() or int(value) < 1:
+        return default
+    return min(int(value), MAX_PAGE_SIZE)
+
+
+def project(request, columns):
+    """
+    The ``values()`` column list for ``?fields=a,b``: the requested subset of
+    ``columns`` in the endpoint's order, plus ``KEY_COLUMNS``. Unknown names are
+    ignored and no ``fields`` means every column.
+    """
+    fields = request.GET.get('fields', '')
+    if not fields:
+        return list(columns)
+    wanted = {*fields.split(','), *KEY_COLUMNS}
+    return [column for column in columns if column in wanted]
+
+
+def encode_rows(request, rows, columns):
+    """
+    ``{'emails': rows}``, or with ``?format=columns`` the column names once and
+    every row as a list in that order: ``{'columns': [...], 'emails': [[...], ...]}``.
+    """
+    if request.GET.get('format') != 'columns':
+        return {'emails': rows}
+    return {'columns': columns, 'emails': [[row[column] for column in columns] for row in rows]}
+
+
+def encode_cursor(direction, row):
+    """Opaque token for the position of ``row`` (a dict with ``source_file_id`` and ``id``)."""
+    raw = json.dumps([direction, row['source_file_id'], row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """``(direction, source_file_id, id)`` from ``encode_cursor``; raises ``ValueError`` for a bad token."""
+    try:
+        direction, source_file_id, last_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if direction not in ('next', 'prev') or not isinstance(last_id, int) or not isinstance(source_file_id, (int, type(None))):
+        raise ValueError('Invalid cursor')
+    return direction, source_file_id, last_id
+
+
+def _after(emails, source_file_id, last_id, limit):
+    # Order is (source_file_id, id) with NULL source files last, on every backend. Each segment
+    # is its own range the (…, source_file_id, id) index can seek to, never an OFFSET: the rest
+    # of the cursor's source file (source_file_id = X AND id > last), then the files after it.
+    rows = []
+    if source_file_id is not None:
+        rows = list(emails.filter(source_file_id=source_file_id, id__gt=last_id).order_by('id')[:limit])
+        if len(rows) < limit:
+            later = emails.filter(source_file_id__gt=source_file_id).order_by('source_file_id', 'id')
+            rows += list(later[:limit - len(rows)])
+        last_id = None
+    elif last_id is None:
+        rows = list(emails.filter(source_file_id__isnull=False).order_by('source_file_id', 'id')[:limit])
+    if len(rows) < limit:
+        unnumbered = emails.filter(source_file_id__isnull=True).order_by('id')
+        if last_id is not None:
+            unnumbered = unnumbered.filter(id__gt=last_id)
+        rows += list(unnumbered[:limit - len(rows)])
+    return rows
+
+
+def _before(emails, source_file_id, last_id, limit):
+    if source_file_id is None:
+        rows = list(emails.filter(source_file_id__isnull=True, id__lt=last_id).order_by('-id')[:limit])
+        earlier = emails.filter(source_file_id__isnull=False)
+    else:
+        rows = list(emails.filter(source_file_id=source_file_id, id__lt=last_id).order_by('-id')[:limit])
+        earlier = emails.filter(source_file_id__lt=source_file_id)
+    if len(rows) < limit:
+        rows += list(earlier.order_by('-source_file_id', '-id')[:limit - len(rows)])
+    rows.reverse()
+    return rows
+
+
+def keyset_page(emails, cursor, per_page=CURSOR_PAGE_SIZE):
+    """
+    One page of a ``values()`` queryset ordered by ``(source_file_id, id)``, starting at ``cursor``.
+
+    ``cursor`` is ``''`` for the first page or a token returned by a previous call.
+    Costs the same on page 1 and page 100,000 and never counts the table. Returns
+    ``(rows, next_cursor, prev_cursor)``; a cursor is ``None`` when there is no
+    such page. ``emails`` must select ``source_file_id`` and ``id``.
+    """
+    if not cursor:
+        rows = _after(emails, None, None, per_page + 1)
+        has_next, has_prev = len(rows) > per_page, False
+        rows = rows[:per_page]
+    else:
+        direction, source_file_id, last_id = decode_cursor(cursor)
+        if direction == 'next':
+            rows = _after(emails, source_file_id, last_id, per_page + 1)
+            has_next, has_prev = len(rows) > per_page, True
+            rows = rows[:per_page]
+        else:
+            rows = _before(emails, source_file_id, last_id, per_page + 1)
+            has_next, has_prev = True, len(rows) > per_page
+            rows = rows[-per_page:] if has_prev else rows
+
+    next_cursor = encode_cursor('next', rows[-1]) if rows and has_next else None
+    prev_cursor = encode_cursor('prev', rows[0]) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
@@ -0,0 +1,125 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import recount
+from .models import AdminEmail, ManagerEmail, StatusEvent, StatusEventCursor, TLEmail
+from .statuses import _allowed_statuses, record_status_events
+
+logger = logging.getLogger(__name__)
+
+PROPAGATION_BATCH_SIZE = 1000
+CURSOR_NAME = 'propagation'
+
+# Event stage -> (source model, target model, target stage). The manager events a TL change
+# writes are read later in the same run, so one run carries the change all the way to admin.
+HOPS = {
+    'tl': (TLEmail, ManagerEmail, 'manager'),
+    'manager': (ManagerEmail, AdminEmail, 'admin'),
+}
+
+# How far along each status is; propagation only ever moves a row forward
+STATUS_ORDER = {'working': 0, 'pending_closed': 1, 'closed': 2}
+
+
+def _behind(status):
+    return [other for other, rank in STATUS_ORDER.items() if rank < STATUS_ORDER[status]]
+
+
+def _latest(events):
+    """
+    ``{stage: {gmail_id: status}}`` for the addresses that changed in ``events``, with
+    each one's current status in its source table, so a row closed and then reopened
+    pushes 'working', not 'closed'.
+    """
+    changed = {stage: set() for stage in HOPS}
+    for _, stage, gmail_id, old_status, new_status in events:
+        if new_status != old_status:
+            changed[stage].add(gmail_id)
+    return {
+        stage: dict(HOPS[stage][0].objects.filter(gmail_id__in=gmail_ids).values_list('gmail_id', 'status'))
+        for stage, gmail_ids in changed.items() if gmail_ids
+    }
+
+
+def _push(statuses, target, stage):
+    """Move ``target`` rows matching ``{gmail_id: status}`` forward to that status; returns rows changed."""
+    allowed = _allowed_statuses(target)
+    groups = {}
+    for gmail_id, status in statuses.items():
+        # e.g. AdminEmail has no pending_closed; the admin row keeps its status until the address is closed
+        if status in allowed and status in STATUS_ORDER:
+            groups.setdefault(status, []).append(gmail_id)
+
+    changed = 0
+    for status, gmail_ids in groups.items():
+        behind = list(
+            target.objects.select_for_update()
+            .filter(gmail_id__in=gmail_ids, status__in=_behind(status))
+            .values_list('id', 'gmail_id', 'status', 'team_id')
+        )
+        if not behind:
+            continue
+        rows = target.objects.filter(id__in=[row[0] for row in behind])
+        with recount(stage, rows):
+            changed += rows.update(status=status)
+        record_status_events([
+            StatusEvent(
+                stage=stage, email_id=email_id, gmail_id=gmail_id, team_id=team_id,
+                old_status=old_status, new_status=status
+            )
+            for email_id, gmail_id, old_status, team_id in behind
+        ])
+    return changed
+
+
+def propagate_statuses(batch_size=PROPAGATION_BATCH_SIZE):
+    """
+    Carry TL and manager status changes downstream: TL -> manager -> admin, matched on ``gmail_id``.
+
+    Driven by the ``StatusEvent`` log from the stored cursor on, so a run costs the
+    number of changes since the last one. Each address that changed pushes its
+    current source status, not an older one from the log. A status only replaces one
+    that is not as far along (``STATUS_ORDER``), so a TL's 'working' never reopens a closed row and
+    re-reading an event changes nothing. Events from the last
+    ``PROPAGATION_SETTLE_SECONDS`` are applied but stay after the cursor, as a
+    transaction still in flight may yet commit an event with a lower id. Every
+    change is logged as a ``StatusEvent``. Returns ``{target_stage: rows_changed}``.
+    """
+    changed = {stage: 0 for _, _, stage in HOPS.values()}
+    settled_before = timezone.now() - timedelta(seconds=settings.PROPAGATION_SETTLE_SECONDS)
+    position = None
+    settled = True
+    while True:
+        with transaction.atomic():
+            cursor, _ = StatusEventCursor.objects.select_for_update().get_or_create(name=CURSOR_NAME)
+            if position is None:
+                position = cursor.last_event_id
+            events = list(
+                StatusEvent.objects.filter(id__gt=position, stage__in=HOPS).order_by('id')
+                .values_list('id', 'stage', 'gmail_id', 'old_status', 'new_status', 'created_at')[:batch_size]
+            )
+            if not events:
+                break
+            for stage, statuses in _latest(event[:5] for event in events).items():
+                _, target, target_stage = HOPS[stage]
+                changed[target_stage] += _push(statuses, target, target_stage)
+            position = events[-1][0]
+
+            for event_id, *_, created_at in events:
+                if created_at >= settled_before:
+                    settled = False
+                if settled and event_id > cursor.last_event_id:
+                    cursor.last_event_id = event_id
+            cursor.save(update_fields=['last_event_id'])
+
+    logger.info(f"Propagated status changes: {changed}")
+    return changed
+
+
+def propagate_after_commit():
+    """Schedule ``propagate_statuses`` for once the current transaction commits."""
+    transaction.on_commit(propagate_statuses)
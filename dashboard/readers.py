@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+import os
+from itertools import chain
+
+from openpyxl import load_workbook
+
+EXCEL_EXTENSIONS = ('.xlsx',)  # openpyxl cannot read legacy .xls workbooks
+DELIMITED_EXTENSIONS = {'.csv': ',', '.tsv': '\t'}
+JSONL_EXTENSIONS = ('.jsonl',)
+UPLOAD_EXTENSIONS = EXCEL_EXTENSIONS + tuple(DELIMITED_EXTENSIONS) + JSONL_EXTENSIONS
+UNSUPPORTED_FORMAT_MESSAGE = "Unsupported file format. Please upload Excel (.xlsx), CSV (.csv, .tsv) or JSON Lines (.jsonl) files."
+
+
+def _normalize_cell(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _iter_sheet_rows(workbook):
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            row = tuple(_normalize_cell(value) for value in row)
+            if any(value is not None for value in row):  # Read-only sheets can report trailing blank rows
+                yield row
+    finally:
+        workbook.close()
+
+
+def _iter_text_lines(source):
+    """Yield decoded lines from a path or a binary file object, closing files we opened."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding='utf-8-sig', newline='') as handle:
+            yield from handle
+    else:
+        handle = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+        try:
+            yield from handle
+        finally:
+            if not source.closed:  # A generator dropped after the upload was closed has nothing to detach
+                handle.detach()  # Leave the caller's file open
+
+
+def _iter_delimited_rows(source, delimiter):
+    for row in csv.reader(_iter_text_lines(source), delimiter=delimiter):
+        row = tuple(_normalize_cell(value) for value in row)
+        if any(value is not None for value in row):
+            yield row
+
+
+class _ObjectKeys(tuple):
+    """Keys of the first JSON Lines object; always used as the header."""
+
+
+def _iter_jsonl_rows(source):
+    keys = None
+    for line in _iter_text_lines(source):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if isinstance(record, dict):
+            if keys is None:
+                keys = _ObjectKeys(record)
+                yield keys
+            yield tuple(_normalize_cell(record.get(key)) for key in keys)
+        else:
+            yield tuple(_normalize_cell(value) for value in record)
+
+
+def _pad_rows(rows, width):
+    for row in rows:
+        if len(row) < width:
+            row += (None,) * (width - len(row))
+        yield row
+
+
+def is_header_row(row, header_keywords):
+    return any(str(value).lower() in header_keywords for value in row if value is not None)
+
+
+def _split_header(rows, header_keywords):
+    first_row = next(rows, None)
+    if first_row is None:
+        return None, iter(())
+
+    rows = _pad_rows(rows, len(first_row))
+    if isinstance(first_row, _ObjectKeys) or is_header_row(first_row, header_keywords):
+        return tuple('' if value is None else str(value) for value in first_row), rows
+    return None, chain([first_row], rows)
+
+
+def read_spreadsheet(source, header_keywords):
+    """
+    Open an Excel workbook once, in openpyxl read-only mode, and return ``(header, rows)``.
+
+    ``header`` is the tuple of first-row column names when that row contains one of
+    ``header_keywords``, otherwise ``None`` and the first row is treated as data.
+    ``rows`` is a lazy iterator of row tuples padded to the first row's width; strings
+    are stripped and blank cells become ``None``. The workbook is closed once ``rows``
+    is exhausted, so memory stays flat regardless of sheet size.
+    """
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    return _split_header(_iter_sheet_rows(workbook), header_keywords)
+
+
+def read_delimited(source, header_keywords, delimiter=','):
+    """Stream a CSV/TSV file with the csv module; same ``(header, rows)`` contract as ``read_spreadsheet``."""
+    return _split_header(_iter_delimited_rows(source, delimiter), header_keywords)
+
+
+def read_jsonl(source, header_keywords):
+    """
+    Stream a JSON Lines file; same ``(header, rows)`` contract as ``read_spreadsheet``.
+
+    Lines may be objects, whose keys (taken from the first line) form the header, or
+    arrays, which are handled like sheet rows.
+    """
+    return _split_header(_iter_jsonl_rows(source), header_keywords)
+
+
+def read_upload(source, file_name, header_keywords):
+    """Pick the streaming reader for ``file_name``'s extension and return ``(header, rows)``."""
+    extension = os.path.splitext(file_name.lower())[1]
+    if extension in EXCEL_EXTENSIONS:
+        return read_spreadsheet(source, header_keywords)
+    if extension in DELIMITED_EXTENSIONS:
+        return read_delimited(source, header_keywords, DELIMITED_EXTENSIONS[extension])
+    if extension in JSONL_EXTENSIONS:
+        return read_jsonl(source, header_keywords)
+    raise ValueError(UNSUPPORTED_FORMAT_MESSAGE)
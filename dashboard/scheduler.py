@@ -0,0 +1,51 @@
+import heapq
+from itertools import count
+
+from django.db.models import Count
+
+from .models import TLEmail
+
+
+class TLScheduler:
+    """
+    Spreads new emails across every TL of a provider, weighted and capped.
+
+    Each pick goes to the TL with the lowest open load per unit of ``tl_weight``
+    (ties go to the TL seen first), skipping TLs whose open load has reached
+    ``tl_capacity``. Open load is the TL's count of ``working`` TLEmail rows, read
+    with a single aggregate query when the scheduler is built and then tracked in
+    memory as emails are handed out.
+    """
+
+    def __init__(self, tls):
+        tls = list(tls)
+        self.load = dict.fromkeys((tl.id for tl in tls), 0)
+        self.load.update(
+            TLEmail.objects.filter(assigned_to__in=tls, status='working')
+            .values_list('assigned_to')
+            .annotate(open=Count('id'))
+        )
+
+        order = count()
+        self._queues = {}
+        for tl in tls:
+            if tl.tl_provider:
+                heapq.heappush(self._queues.setdefault(tl.tl_provider.lower(), []), self._entry(tl, next(order)))
+
+    def _entry(self, tl, order):
+        return self.load[tl.id] / max(tl.tl_weight, 1), order, tl
+
+    def has_provider(self, provider):
+        return (provider or '').lower() in self._queues
+
+    def pick(self, provider):
+        """Return the TL that should take the next email for ``provider``, or ``None`` if all are full."""
+        queue = self._queues.get((provider or '').lower())
+        while queue:
+            _, order, tl = heapq.heappop(queue)
+            if tl.tl_capacity is not None and self.load[tl.id] >= tl.tl_capacity:
+                continue  # Full for the rest of this run
+            self.load[tl.id] += 1
+            heapq.heappush(queue, self._entry(tl, order))
+            return tl
+        return None
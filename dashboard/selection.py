@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import AdminEmail
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _int_list(value, key):
+    try:
+        return [int(item) for item in _as_list(value)]
+    except (TypeError, ValueError):
+        raise ValueError(f'{key} must be an integer or a list of integers')
+
+
+def _bound(value, key):
+    value = str(value)
+    parsed = parse_date(value) or parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'{key} must be an ISO date or datetime')
+    if isinstance(parsed, datetime) and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_q(spec):
+    """
+    Build a ``Q`` for AdminEmail from a JSON filter spec.
+
+    Supported keys: ``source_file_id`` and ``file_id`` (an id or a list), ``provider``
+    (a name or a list, case-insensitive), ``unassigned`` (``true`` for rows with no
+    team), ``created_from`` / ``created_to`` (ISO date or datetime, inclusive; a bare
+    date covers the whole day). An empty spec selects every row. Raises
+    ``ValueError`` for unknown keys or malformed values.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError('filter must be an object')
+
+    q = Q()
+    for key, value in spec.items():
+        if key == 'source_file_id':
+            q &= Q(source_file_id__in=_int_list(value, key))
+        elif key == 'file_id':
+            q &= Q(file_id__in=_int_list(value, key))
+        elif key == 'provider':
+            providers = Q()
+            for provider in _as_list(value):
+                providers |= Q(provider__iexact=str(provider))
+            q &= providers
+        elif key == 'unassigned':
+            if value:
+                q &= Q(team__isnull=True)
+        elif key == 'created_from':
+            bound = _bound(value, key)
+            q &= Q(created_at__gte=bound) if isinstance(bound, datetime) else Q(created_at__date__gte=bound)
+        elif key == 'created_to':
+            bound = _bound(value, key)
+            q &= Q(created_at__lte=bound) if isinstance(bound, datetime) else Q(created_at__date__lte=bound)
+        else:
+            raise ValueError(f'Unknown filter key: {key}')
+    return q
+
+
+def select_admin_emails(spec):
+    """The AdminEmail rows matched by a filter spec, see ``filter_q``."""
+    return AdminEmail.objects.filter(filter_q(spec))
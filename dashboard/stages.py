@@ -0,0 +1,40 @@
+from django.db.models import CharField, Value
+
+from .canonical import canonical_email
+from .models import AdminEmail, ClosedEmail, ManagerEmail, TLEmail
+
+# Every table an address can live in, in pipeline order
+STAGE_MODELS = {
+    'admin': AdminEmail,
+    'manager': ManagerEmail,
+    'tl': TLEmail,
+    'closed': ClosedEmail,
+}
+
+
+def find_in_stages(gmail_ids, stages=None, canonical=False):
+    """
+    Answer "does this address exist in any stage?" for a whole batch in one query.
+
+    Returns ``{canonical_gmail_id: {stage, ...}}`` for the addresses of ``gmail_ids``
+    found in ``stages`` (all of ``STAGE_MODELS`` by default); addresses that exist
+    nowhere are left out. Pass ``canonical=True`` when the ids are already
+    canonicalized. Relies on ``canonical_gmail_id`` being filled in: migration 0025
+    backfills it and every write path sets it.
+    """
+    canonicals = set(gmail_ids) if canonical else {canonical_email(gmail_id) for gmail_id in gmail_ids}
+    canonicals.discard(None)
+    if not canonicals:
+        return {}
+
+    queries = [
+        STAGE_MODELS[stage].objects
+        .filter(canonical_gmail_id__in=canonicals)
+        .annotate(stage=Value(stage, output_field=CharField()))
+        .values_list('canonical_gmail_id', 'stage')
+        for stage in (stages or STAGE_MODELS)
+    ]
+    found = {}
+    for canonical_gmail_id, stage in queries[0].union(*queries[1:]):
+        found.setdefault(canonical_gmail_id, set()).add(stage)
+    return found
@@ -0,0 +1,106 @@
+import logging
+
+from django.db import transaction
+
+from .counters import recount
+from .models import StatusEvent
+
+logger = logging.getLogger(__name__)
+
+MAX_STATUS_BATCH = 5000
+MAX_EVENTS_PAGE = 1000
+
+
+def _allowed_statuses(model):
+    return {value for value, _ in model._meta.get_field('status').choices}
+
+
+def parse_status_map(statuses, model):
+    """
+    Validate a ``{email_id: status}`` map once, up front.
+
+    Returns ``({status: [ids]}, invalid_count)``; entries with a non-numeric id or
+    a status outside the model's choices are counted as invalid and dropped.
+    Raises ``ValueError`` when the map is not an object or is too large.
+    """
+    if not isinstance(statuses, dict):
+        raise ValueError('statuses must be an object of {id: status}')
+    if len(statuses) > MAX_STATUS_BATCH:
+        raise ValueError(f'At most {MAX_STATUS_BATCH} statuses can be saved at once')
+
+    allowed = _allowed_statuses(model)
+    groups = {}
+    invalid = 0
+    for email_id, status in statuses.items():
+        if not str(email_id).isdigit() or status not in allowed:
+            invalid += 1
+            continue
+        groups.setdefault(status, []).append(int(email_id))
+    return groups, invalid
+
+
+def record_status_events(events, batch_size=1000):
+    """Append ``StatusEvent`` objects to the log in bulk; call inside the writer's transaction."""
+    StatusEvent.objects.bulk_create(events, batch_size=batch_size)
+
+
+def apply_statuses(model, groups, stage, changed_by=None, **scope):
+    """
+    Apply grouped status changes with one scoped UPDATE per target status.
+
+    ``scope`` (e.g. ``team=…``, ``assigned_to=…``) is part of every UPDATE's WHERE
+    clause, so rows outside it are never touched. Everything runs in one transaction;
+    the stage's counters follow, and every row whose status actually changed gets a
+    ``StatusEvent``. Returns
+    ``{'updated', 'not_found', 'unauthorized'}`` counts.
+    """
+    ids = {email_id for group in groups.values() for email_id in group}
+    with transaction.atomic():
+        scoped = model.objects.filter(**scope)
+        current = {row[0]: row for row in scoped.filter(id__in=ids).values_list('id', 'gmail_id', 'status', 'team_id')}
+        outside = ids - set(current)
+        exists = set(model.objects.filter(id__in=outside).values_list('id', flat=True)) if outside else set()
+
+        updated = 0
+        events = []
+        with recount(stage, model.objects.filter(id__in=list(current))):
+            for status, group in groups.items():
+                group = [email_id for email_id in group if email_id in current]
+                if not group:
+                    continue
+                rows = scoped.filter(id__in=group)
+                updated += rows.update(status=status)
+                events.extend(
+                    StatusEvent(
+                        stage=stage, email_id=email_id, gmail_id=gmail_id, team_id=team_id,
+                        old_status=old_status, new_status=status, changed_by=changed_by
+                    )
+                    for email_id, gmail_id, old_status, team_id in map(current.get, group)
+                    if old_status != status
+                )
+        record_status_events(events)
+
+    counts = {'updated': updated, 'not_found': len(outside - exists), 'unauthorized': len(exists)}
+    logger.info(f"Applied {model.__name__} status changes: {counts}, {len(events)} event(s)")
+    return counts
+
+
+def events_since(cursor, limit=MAX_EVENTS_PAGE, stage=None, team=None):
+    """
+    Status events after ``cursor`` (an event id; 0 for the beginning), oldest first.
+
+    A range scan on the primary key, or on ``(team, id)`` when scoped to a team, so
+    the cost follows the number of changes, not the size of the email tables.
+    Returns ``(events, next_cursor, has_more)``.
+    """
+    events = StatusEvent.objects.filter(id__gt=cursor).order_by('id')
+    if stage:
+        events = events.filter(stage=stage)
+    if team is not None:
+        events = events.filter(team=team)
+    page = list(events.values(
+        'id', 'stage', 'email_id', 'gmail_id', 'team_id', 'old_status', 'new_status', 'changed_by_id', 'created_at'
+    )[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+    return page, page[-1]['id'] if page else cursor, has_more
@@ -0,0 +1,84 @@
+import hashlib
+import os
+
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+
+from .readers import UPLOAD_EXTENSIONS
+
+
+class ExtensionCheckUploadHandler(FileUploadHandler):
+    """
+    Reject uploads with an unsupported extension before any of their bytes are
+    buffered in memory or spooled to a temporary file.
+
+    Must come first in ``FILE_UPLOAD_HANDLERS``. Rejected file names are kept on
+    the handler; views read them back with ``rejected_uploads(request)``.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.rejected = []
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        if not file_name.lower().endswith(UPLOAD_EXTENSIONS):
+            self.rejected.append(file_name)
+            raise SkipFile
+        super().new_file(field_name, file_name, *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+class ChecksumUploadHandler(FileUploadHandler):
+    """
+    Compute a SHA-256 of every uploaded file while its chunks stream in, then pass
+    the data on untouched to the handlers that buffer or spool it.
+
+    Checksums are kept per form field in upload order; views read them back with
+    ``upload_checksums(request, field_name)``.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.checksums = {}
+        self._digest = None
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self._digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._digest.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.checksums.setdefault(self.field_name, []).append(self._digest.hexdigest())
+        return None
+
+
+def upload_checksums(request, field_name):
+    """SHA-256 hex digests of the files uploaded under ``field_name``, in ``getlist`` order."""
+    request.FILES  # Make sure the multipart body has been parsed
+    for handler in request.upload_handlers:
+        if isinstance(handler, ChecksumUploadHandler):
+            return handler.checksums.get(field_name, [])
+    return []
+
+
+def rejected_uploads(request):
+    """Names of uploaded files skipped by ``ExtensionCheckUploadHandler`` for this request."""
+    request.FILES  # Make sure the multipart body has been parsed
+    return [
+        name
+        for handler in request.upload_handlers
+        if isinstance(handler, ExtensionCheckUploadHandler)
+        for name in handler.rejected
+    ]
+
+
+def import_upload_path(instance, filename):
+    """Store queued imports under a random name so same-named uploads never collide."""
+    return f"imports/{os.urandom(16).hex()}{os.path.splitext(filename)[1].lower()}"
@@ -16,6 +16,8 @@ urlpatterns = [
     path('team-dashboard-data/', views.team_dashboard_data, name='team_dashboard_data'),
     path('export-team-emails/', views.export_team_emails, name='export_team_emails'),
     path('admin-files-data/', views.admin_files_data, name='admin_files_data'),
+    path('import-jobs/status/', views.import_jobs_status, name='import_jobs_status'),
+    path('import-jobs/<int:job_id>/duplicates/', views.import_job_duplicates, name='import_job_duplicates'),
     path('delete-file/<int:file_id>/', views.delete_file, name='delete_file'),
     path('admin-dashboard-data/', views.admin_dashboard_data, name='admin_dashboard_data'),
     path('delete-all-emails/', views.delete_all_emails, name='delete_all_emails'),
@@ -23,6 +25,8 @@ urlpatterns = [
     path('delete-emails-by-source/<int:file_id>/', views.delete_emails_by_source, name='delete_emails_by_source'),
     path('update-team-email-status/', views.update_team_email_status, name='update_team_email_status'),
     path('update-tl-email-status/', views.update_tl_email_status, name='update_tl_email_status'),
+    path('status-events/', views.status_events, name='status_events'),
+    path('dashboard-cache/stats/', views.dashboard_cache_stats, name='dashboard_cache_stats'),
     path('tl-dashboard/', views.tl_dashboard, name='tl_dashboard'),
     path('tl-dashboard-data/', views.tl_dashboard_data, name='tl_dashboard_data'),
     path('assign-emails-to-team/', views.assign_emails_to_team, name='assign_emails_to_team'),
@@ -30,6 +34,7 @@ urlpatterns = [
     path('assign-emails-to-tls/', views.assign_emails_to_tls, name='assign_emails_to_tls'),
     path('export-tl-emails/', views.export_tl_emails, name='export_tl_emails'),
     path('import-tl-emails/', views.import_tl_emails, name='import_tl_emails'),
+    path('claim-tl-emails/', views.claim_tl_emails, name='claim_tl_emails'),
     path('delete-all-tl-emails/', views.delete_all_tl_emails, name='delete_all_tl_emails'),
     path('closed-emails/', views.closed_emails_page, name='closed_emails_page'),
     path('closed-emails-data/', views.closed_emails_data, name='closed_emails_data'),
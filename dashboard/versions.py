@@ -0,0 +1,33 @@
+from django.db.models import F
+
+from .models import DashboardVersion
+
+ADMIN_SCOPE = 'admin'
+
+
+def team_scope(team_id):
+    return f'team:{team_id}'
+
+
+def stage_scopes(stage, team_ids):
+    """Scopes whose dashboards show rows of ``stage``: the admin page, or the teams' manager and TL pages."""
+    if stage == 'admin':
+        return {ADMIN_SCOPE}
+    return {team_scope(team_id) for team_id in team_ids if team_id}
+
+
+def bump(scopes):
+    """
+    Advance the version of each scope, in the caller's transaction, so the new
+    version becomes visible together with the rows that changed.
+    """
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+    DashboardVersion.objects.bulk_create([DashboardVersion(scope=scope) for scope in scopes], ignore_conflicts=True)
+    DashboardVersion.objects.filter(scope__in=scopes).update(version=F('version') + 1)
+
+
+def current(scope):
+    """The scope's version, 0 before its first write; one primary key lookup."""
+    return DashboardVersion.objects.filter(scope=scope).values_list('version', flat=True).first() or 0
@@ -1,19 +1,38 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse, StreamingHttpResponse
 from .forms import CustomUserCreationForm
-from .models import AdminEmail, ClosedEmail, ManagerEmail, TLEmail, UserProfile, Team, File
+from .models import AdminEmail, ClosedEmail, ManagerEmail, TLEmail, UserProfile, Team, File, ImportDuplicate, ImportJob, StatusEvent
+from .assign import assign_to_team, assign_to_tls, claim_for_tl
+from .cache import cache_stats, cached_response, data_etag, request_version
+from .counters import counted_providers, counted_total, delete_counted, recount
+from .jobs import enqueue_import, find_previous_import
+from .normalize import CLOSED_IMPORT, TL_IMPORT, normalize_rows
+from .pagination import encode_rows, keyset_page, page_size, project
+from .propagation import propagate_after_commit
+from .readers import UNSUPPORTED_FORMAT_MESSAGE, read_upload
+from .scheduler import TLScheduler
+from .selection import select_admin_emails
+from .statuses import MAX_EVENTS_PAGE, apply_statuses, events_since, parse_status_map, record_status_events
+from .uploads import rejected_uploads, upload_checksums
+from .versions import ADMIN_SCOPE, bump, team_scope
 import pandas as pd
-import os
+import csv
 import json
 import logging
 import math
 import io
+import os
+import tempfile
+from itertools import chain
+import xlsxwriter
 from django.core.exceptions import ObjectDoesNotExist
 from django.views.decorators.csrf import csrf_exempt
-from django.db import connection
-from django.views.decorators.http import require_GET, require_POST
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max, Sum
+from django.views.decorators.http import condition, require_GET, require_POST
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -84,6 +103,11 @@ def home(request):
 
 @login_required
 def admin_dashboard(request):
+    rejected = rejected_uploads(request) if request.method == 'POST' else []
+    if rejected:
+        logger.error(f"Validation error processing file {rejected[0]}: unsupported format")
+        return JsonResponse({'error': f'Validation error with file {rejected[0]}: {UNSUPPORTED_FORMAT_MESSAGE}'}, status=400)
+
     if request.method == 'POST' and request.FILES.getlist('excel_files'):
         files = request.FILES.getlist('excel_files')
         file_ids = request.POST.getlist('file_ids[]')
@@ -94,122 +118,45 @@ def admin_dashboard(request):
             logger.error("Mismatch in uploaded files and metadata.")
             return JsonResponse({"error": "Mismatch between number of files, file IDs, and sources"}, status=400)
 
-        os.makedirs('uploads', exist_ok=True)
-        imported_counts = {}
-        seen_emails = set()  # Track emails in current upload
-        duplicate_emails = set()  # Store all duplicates (current batch + existing)
-
-        # Get existing emails from the table
-        existing_emails = set(AdminEmail.objects.values_list('gmail_id', flat=True))
-
-        for file, file_id, source in zip(files, file_ids, sources):
-            file_path = os.path.join('uploads', file.name)
+        checksums = upload_checksums(request, 'excel_files')
+        checksums += [None] * (len(files) - len(checksums))
+        force = request.POST.get('force') == 'true'
+        job_ids = []
+        skipped_files = []
+        for file, file_id, source, checksum in zip(files, file_ids, sources, checksums):
             try:
-                with open(file_path, 'wb+') as destination:
-                    for chunk in file.chunks():
-                        destination.write(chunk)
-
-                if not file.name.lower().endswith(('.xlsx', '.xls')):
-                    raise ValueError("Unsupported file format. Please upload Excel files (.xlsx or .xls).")
-
-                df_try = pd.read_excel(file_path, header=0, engine='openpyxl')
-                header_keywords = ['gmail', 'email', 'gmail_id', 'password', 'recovery', 'provider', 'price']
-                has_header = any(str(col).lower() in header_keywords for col in df_try.columns)
-
-                if has_header:
-                    df = df_try
-                else:
-                    df = pd.read_excel(file_path, header=None, engine='openpyxl')
-
-                imported_count = 0
-                file_instance = File.objects.create(
-                    file_name=file.name,
-                    date=pd.Timestamp.now(),
-                    count=0,
-                    source=source
-                )
-
-                for index, row in df.iterrows():
-                    email_data = {}
-                    try:
-                        if has_header:
-                            for col in df.columns:
-                                value = str(row.get(col, '')).strip() if pd.notna(row.get(col)) else ''
-                                col_lower = str(col).lower()
-                                if 'gmail' in col_lower:
-                                    email_data['gmail_id'] = value
-                                elif 'pass' in col_lower:
-                                    email_data['password'] = value
-                                elif 'recover' in col_lower:
-                                    email_data['recovery_email'] = value
-                                elif 'provid' in col_lower:
-                                    email_data['provider'] = value  # No default yet
-                                elif 'price' in col_lower:
-                                    try:
-                                        email_data['price'] = float(value)
-                                    except (ValueError, TypeError):
-                                        email_data['price'] = None
-                        else:
-                            email_data = {
-                                'gmail_id': str(row[0]).strip() if pd.notna(row[0]) else '',
-                                'password': str(row[1]).strip() if len(row) > 1 and pd.notna(row[1]) else '',
-                                'recovery_email': str(row[2]).strip() if len(row) > 2 and pd.notna(row[2]) else '',
-                                'provider': str(row[3]).strip() if len(row) > 3 and pd.notna(row[3]) else '',
-                                'price': float(row[4]) if len(row) > 4 and pd.notna(row[4]) else None,
-                            }
-
-                        # 🛠️ Auto-detect provider from email if not specified
-                        if not email_data.get('provider'):
-                            email = email_data.get('gmail_id', '')
-                            if '@' in email:
-                                email_data['provider'] = email.split('@')[-1].split('.')[0].lower()
-                            else:
-                                email_data['provider'] = 'gmail'
-
-                        gmail_id = email_data.get('gmail_id')
-                        if gmail_id:
-                            if gmail_id in seen_emails or gmail_id in existing_emails:
-                                duplicate_emails.add(gmail_id)
-                            else:
-                                seen_emails.add(gmail_id)
-
-                            if not AdminEmail.objects.filter(gmail_id=gmail_id).exists():
-                                AdminEmail.objects.create(
-                                    **email_data,
-                                    team=None,
-                                    file=file_instance,
-                                    source_file_id=int(file_id)
-                                )
-                                imported_count += 1
-
-                    except Exception as inner_e:
-                        logger.warning(f"Skipping row {index} in {file.name} due to error: {inner_e}")
-                        continue
-
-                file_instance.count = imported_count
-                file_instance.save()
-                imported_counts[file.name] = imported_count
-                logger.info(f"Imported {imported_count} emails from {file.name}")
-
+                previous = None if force else find_previous_import(checksum)
+                if previous is not None:
+                    # Same bytes already imported (or queued): skip parsing entirely
+                    logger.info(f"Skipping {file.name}: identical to {previous._meta.model_name} {previous.id}")
+                    skipped_files.append({
+                        'file_name': file.name,
+                        'file_id': file_id,
+                        'source': source,
+                        'original_file_id': previous.id if isinstance(previous, File) else None,
+                        'original_job_id': previous.id if isinstance(previous, ImportJob) else None,
+                        'original_file_name': previous.file_name,
+                    })
+                    continue
+                job = enqueue_import(file, file_id, source, user=request.user, checksum=checksum)
+                job_ids.append(job.id)
             except ValueError as ve:
                 logger.error(f"Validation error processing file {file.name}: {str(ve)}")
                 return JsonResponse({'error': f'Validation error with file {file.name}: {str(ve)}'}, status=400)
             except Exception as e:
                 logger.error(f"Error processing file {file.name}: {str(e)}")
                 return JsonResponse({'error': f'Error processing file {file.name}: {str(e)}'}, status=500)
-            finally:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
 
-        total_imported = sum(imported_counts.values())
+        message = f'{len(job_ids)} file(s) uploaded and queued for import.'
+        if skipped_files:
+            message += f' {len(skipped_files)} file(s) were already imported and skipped.'
         teams = list(Team.objects.values_list('id', 'name'))
-        context = {
-            'message': f'Files uploaded and {total_imported} emails imported successfully.',
-            'prompt_team': True if teams and total_imported > 0 else False,
-            'teams': teams,
-            'duplicate_emails': list(duplicate_emails) if duplicate_emails else None
-        }
-        return JsonResponse(context)
+        return JsonResponse({
+            'message': message,
+            'job_ids': job_ids,
+            'skipped_files': skipped_files,
+            'teams': teams
+        }, status=202)
 
     emails = AdminEmail.objects.all()
     teams = Team.objects.all()
@@ -229,7 +176,7 @@ def team_dashboard(request):
         email_id = request.POST.get('email_id')
         try:
             email = ManagerEmail.objects.get(id=email_id, team=team)
-            email.delete()
+            delete_counted('manager', ManagerEmail.objects.filter(id=email.id))
             logger.info(f"Deleted email with id {email_id} by {request.user.username}")
             return JsonResponse({'message': 'Email deleted successfully.'})
         except ManagerEmail.DoesNotExist:
@@ -241,7 +188,33 @@ def team_dashboard(request):
         'emails': emails
     })
 
+def _cursor_page(request, emails, columns, **extra):
+    """
+    Cursor mode of the *_data endpoints, used when ?cursor= is present (empty for the
+    first page): a keyset page ordered by (source_file_id, id) with opaque
+    next/prev cursors and no total count.
+    """
+    try:
+        rows, next_cursor, prev_cursor = keyset_page(emails, request.GET['cursor'], page_size(request))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        **encode_rows(request, rows, columns),
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+        'has_next': next_cursor is not None,
+        'has_prev': prev_cursor is not None,
+        **extra
+    })
+
+def _team_data_etag(request):
+    profile = request.user.userprofile
+    if profile.is_admin or profile.role != 'manager' or not profile.team_id:
+        return None  # The view answers with its 403
+    return data_etag(request, 'team_dashboard_data', request_version(request, team_scope(profile.team_id)), profile.team_id)
+
 @login_required
+@condition(etag_func=_team_data_etag)
 def team_dashboard_data(request):
     profile = request.user.userprofile
     if not profile or profile.is_admin:
@@ -249,37 +222,41 @@ def team_dashboard_data(request):
     team = profile.team
     if not team or profile.role != 'manager':
         return JsonResponse({'message': 'Unauthorized or not a Manager.'}, status=403)
+    return cached_response(request, 'team_dashboard_data', team.id, lambda: _team_dashboard_data(request, team))
 
+def _team_dashboard_data(request, team):
     page = request.GET.get('page', 1)
     search_id = request.GET.get('search_id', '')
     status = request.GET.get('status', '')
-    per_page = 10
+    per_page = page_size(request)
+    columns = project(request, ('id', 'source_file_id', 'gmail_id', 'password', 'recovery_email', 'provider', 'price', 'status'))
     try:
         page = int(page)
         start = (page - 1) * per_page
         end = start + per_page
-        emails = ManagerEmail.objects.filter(team=team).values('id', 'source_file_id', 'gmail_id', 'password', 'recovery_email', 'provider', 'price', 'status').order_by('source_file_id', 'id')
+        emails = ManagerEmail.objects.filter(team=team).values(*columns).order_by('source_file_id', 'id')
         
         if search_id and search_id.isdigit():
             emails = emails.filter(source_file_id=int(search_id))
         if status in ['working', 'closed']:
             emails = emails.filter(status=status)
         
-        total = emails.count()
+        # Provider and page counts come from the counters table, not COUNT(*) over manager_emails
+        provider_counts = counted_providers('manager', ['gmail', 'yahoo', 'hotmail'], team=team)
+        if 'cursor' in request.GET:
+            return _cursor_page(request, emails, columns, team_name=team.name, provider_counts=provider_counts)
+
+        if search_id and search_id.isdigit():
+            total = emails.count()
+        else:
+            total = counted_total('manager', team=team, status=status if status in ['working', 'closed'] else None)
         total_pages = math.ceil(total / per_page) if total > 0 else 1
         has_next = end < total
         has_prev = page > 1
         emails_list = list(emails[start:end])
         
-        # Calculate provider counts
-        provider_counts = {
-            'gmail': ManagerEmail.objects.filter(team=team, provider__iexact='gmail').count(),
-            'yahoo': ManagerEmail.objects.filter(team=team, provider__iexact='yahoo').count(),
-            'hotmail': ManagerEmail.objects.filter(team=team, provider__iexact='hotmail').count()
-        }
-        
         return JsonResponse({
-            'emails': emails_list,
+            **encode_rows(request, emails_list, columns),
             'total': total,
             'current_page': page,
             'total_pages': total_pages,
@@ -299,18 +276,32 @@ def tl_dashboard(request):
     if not team or profile.role != 'tl':
         return JsonResponse({'message': 'Unauthorized or not a TL.'}, status=403)
     
+    rejected = rejected_uploads(request) if request.method == 'POST' else []
+    if rejected:
+        return JsonResponse({'error': f'Error processing file: {UNSUPPORTED_FORMAT_MESSAGE}'}, status=400)
+
     if request.method == 'POST' and request.FILES.get('excel_file'):
         file = request.FILES['excel_file']
-        df = pd.read_excel(file, engine='openpyxl')
-        
-        for index, row in df.iterrows():
-            gmail_id = str(row.get('Gmail ID', '')).strip()  # Match export column name
-            new_password = str(row.get('New Password', '')).strip()  # Match export column name
-            if gmail_id and TLEmail.objects.filter(gmail_id=gmail_id, team=team, assigned_to=profile).exists():
-                email = TLEmail.objects.get(gmail_id=gmail_id, team=team, assigned_to=profile)
-                email.new_password = new_password
-                email.save()
-                logger.info(f"Updated new_password for {gmail_id} by {request.user.username}")
+        try:
+            header, rows = read_upload(file, file.name, TL_IMPORT.header_keywords)
+
+            for batch in normalize_rows(header, rows, TL_IMPORT):
+                # Match export column names ('Gmail ID', 'New Password')
+                existing = {
+                    email.gmail_id: email
+                    for email in TLEmail.objects.filter(gmail_id__in=list(batch['gmail_id']), team=team, assigned_to=profile)
+                }
+                for row in batch.records():
+                    email = existing.get(row['gmail_id'])
+                    if email:
+                        email.new_password = row['new_password']
+                        email.save()
+                        logger.info(f"Updated new_password for {row['gmail_id']} by {request.user.username}")
+        except ValueError as ve:
+            logger.error(f"Validation error processing file {file.name} for TL {request.user.username}: {str(ve)}")
+            return JsonResponse({'error': f'Error processing file: {str(ve)}'}, status=400)
+        finally:
+            bump([team_scope(team.id)])
         
         emails = TLEmail.objects.filter(team=team, assigned_to=profile)
         return render(request, 'dashboard/tl_dashboard.html', {
@@ -324,7 +315,14 @@ def tl_dashboard(request):
         'emails': emails
     })
 
+def _tl_data_etag(request):
+    profile = request.user.userprofile
+    if profile.is_admin or profile.role != 'tl' or not profile.team_id:
+        return None
+    return data_etag(request, 'tl_dashboard_data', request_version(request, team_scope(profile.team_id)), profile.team_id, profile.id)
+
 @login_required
+@condition(etag_func=_tl_data_etag)
 def tl_dashboard_data(request):
     profile = request.user.userprofile
     if not profile or profile.is_admin:
@@ -332,30 +330,40 @@ def tl_dashboard_data(request):
     team = profile.team
     if not team or profile.role != 'tl':
         return JsonResponse({'message': 'Unauthorized or not a TL.'}, status=403)
+    return cached_response(
+        request, 'tl_dashboard_data', team.id, lambda: _tl_dashboard_data(request, team, profile), assignee_id=profile.id
+    )
 
+def _tl_dashboard_data(request, team, profile):
     page = request.GET.get('page', 1)
     search_id = request.GET.get('search_id', '')
     status = request.GET.get('status', '')
-    per_page = 10
+    per_page = page_size(request)
+    columns = project(request, ('id', 'source_file_id', 'gmail_id', 'password', 'recovery_email', 'provider', 'new_password', 'status'))
     try:
         page = int(page)
         start = (page - 1) * per_page
         end = start + per_page
-        emails = TLEmail.objects.filter(team=team, assigned_to=profile).values('id', 'source_file_id', 'gmail_id', 'password', 'recovery_email', 'provider', 'new_password', 'status')
+        emails = TLEmail.objects.filter(team=team, assigned_to=profile).values(*columns).order_by('source_file_id', 'id')
         
         if search_id and search_id.isdigit():
             emails = emails.filter(source_file_id=int(search_id))
         if status in ['working', 'closed']:
             emails = emails.filter(status=status)
+        if 'cursor' in request.GET:
+            return _cursor_page(request, emails, columns, team_name=team.name)
         
-        total = emails.count()
+        if search_id and search_id.isdigit():
+            total = emails.count()
+        else:
+            total = counted_total('tl', team=team, assignee=profile, status=status if status in ['working', 'closed'] else None)
         total_pages = math.ceil(total / per_page) if total > 0 else 1
         has_next = end < total
         has_prev = page > 1
         emails_list = list(emails[start:end])
         
         return JsonResponse({
-            'emails': emails_list,
+            **encode_rows(request, emails_list, columns),
             'total': total,
             'current_page': page,
             'total_pages': total_pages,
@@ -366,6 +374,14 @@ def tl_dashboard_data(request):
     except ValueError:
         return JsonResponse({'message': 'Invalid page number.'})
 
+@require_GET
+@login_required
+def dashboard_cache_stats(request):
+    """Hit/miss counters of the team/TL dashboard cache."""
+    if not request.user.userprofile.is_admin:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    return JsonResponse({**cache_stats(), 'backend': settings.DASHBOARD_CACHE_BACKEND})
+
 @login_required
 def get_emails(request):
     """
@@ -375,10 +391,11 @@ def get_emails(request):
     page = request.GET.get('page', 1)
     search_id = request.GET.get('search_id', '')
     all_emails = request.GET.get('all', '') == 'true'
-    per_page = 10
+    per_page = page_size(request)
+    columns = project(request, ('id', 'source_file_id', 'gmail_id', 'password', 'recovery_email', 'provider', 'price', 'team__name'))
 
     try:
-        emails = AdminEmail.objects.all().values('id', 'source_file_id', 'gmail_id', 'password', 'recovery_email', 'provider', 'price', 'team__name').order_by('source_file_id', 'id')
+        emails = AdminEmail.objects.all().values(*columns).order_by('source_file_id', 'id')
         if search_id and search_id.isdigit():
             emails = emails.filter(source_file_id=int(search_id))
 
@@ -387,16 +404,18 @@ def get_emails(request):
             if not profile.is_admin:
                 return JsonResponse({'error': 'Unauthorized to fetch all emails.'}, status=403)
             return JsonResponse({'emails': list(emails.values('id'))})
+        if 'cursor' in request.GET:
+            return _cursor_page(request, emails, columns)
 
         page = int(page)
         start = (page - 1) * per_page
         end = start + per_page
-        total = emails.count()
+        total = emails.count() if search_id and search_id.isdigit() else counted_total('admin')
         has_next = end < total
         has_prev = page > 1
 
         return JsonResponse({
-            'emails': list(emails[start:end]),
+            **encode_rows(request, list(emails[start:end]), columns),
             'total': total,
             'current_page': page,
             'has_next': has_next,
@@ -412,9 +431,18 @@ def delete_all_emails(request):
             profile = request.user.userprofile
             if not profile or not profile.is_admin:
                 return JsonResponse({'error': 'Unauthorized to delete all emails.'}, status=403)
-            deleted_count, _ = AdminEmail.objects.all().delete()
+            filter_spec = json.loads(request.body).get('filter') if request.body else None
+            if filter_spec is not None:
+                deleted_count, _ = delete_counted('admin', select_admin_emails(filter_spec))
+                logger.info(f"Deleted {deleted_count} emails matching {filter_spec} by {request.user.username}")
+                return JsonResponse({'message': f'{deleted_count} emails deleted successfully.', 'deleted': deleted_count})
+            deleted_count, _ = delete_counted('admin', AdminEmail.objects.all())
             logger.info(f"Deleted all {deleted_count} emails by {request.user.username}")
             return JsonResponse({'message': f'All {deleted_count} emails deleted successfully.'})
+        except (json.JSONDecodeError, AttributeError):
+            return JsonResponse({'error': 'Invalid JSON data.'}, status=400)
+        except ValueError as ve:
+            return JsonResponse({'error': f'Invalid filter: {str(ve)}'}, status=400)
         except Exception as e:
             logger.error(f"Error deleting all emails: {str(e)}")
             return JsonResponse({'error': 'Error deleting emails.'}, status=500)
@@ -428,7 +456,7 @@ def delete_email(request, email_id):
             if not profile or not profile.is_admin:
                 return JsonResponse({'error': 'Unauthorized to delete email.'}, status=403)
             email = AdminEmail.objects.get(id=email_id)
-            email.delete()
+            delete_counted('admin', AdminEmail.objects.filter(id=email.id))
             logger.info(f"Deleted email with id {email_id} by {request.user.username}")
             return JsonResponse({'message': 'Email deleted successfully.'})
         except AdminEmail.DoesNotExist:
@@ -446,7 +474,7 @@ def delete_all_emails_for_team(request):
             if not team:
                 return JsonResponse({'error': 'You are not assigned to a team.'}, status=403)
 
-            deleted_count, _ = ManagerEmail.objects.filter(team=team).delete()
+            deleted_count, _ = delete_counted('manager', ManagerEmail.objects.filter(team=team))
             logger.info(f"Deleted {deleted_count} emails for team {team.name} by {request.user.username}")
             return JsonResponse({'message': f'Successfully deleted {deleted_count} emails for {team.name}.'})
         except Exception as e:
@@ -466,7 +494,7 @@ def delete_team_email(request, email_id):
                 return JsonResponse({'error': 'You are not assigned to a team.'}, status=403)
 
             email = ManagerEmail.objects.get(id=email_id, team=team)
-            email.delete()
+            delete_counted('manager', ManagerEmail.objects.filter(id=email.id))
             logger.info(f"Deleted email with id {email_id} for team {team.name} by {request.user.username}")
             return JsonResponse({'message': 'Email deleted successfully.'})
         except ManagerEmail.DoesNotExist:
@@ -488,7 +516,7 @@ def delete_tl_email(request, email_id):
             return JsonResponse({'error': 'You are not assigned to a team.'}, status=403)
 
         email = TLEmail.objects.get(id=email_id, team=team, assigned_to=profile)
-        email.delete()
+        delete_counted('tl', TLEmail.objects.filter(id=email.id))
         logger.info(f"Deleted email with id {email_id} for TL {profile.user.username}")
         return JsonResponse({'message': 'Email deleted successfully.'})
     except TLEmail.DoesNotExist:
@@ -504,63 +532,37 @@ def assign_emails_to_team(request):
             data = json.loads(request.body)
             team_id = data.get('team_id')
             email_ids = data.get('email_ids', [])
+            filter_spec = data.get('filter')
 
-            logger.debug(f"Received data: team_id={team_id}, email_ids={email_ids}")
+            logger.debug(f"Received data: team_id={team_id}, email_ids={len(email_ids)}, filter={filter_spec}")
             if not team_id:
                 return JsonResponse({'error': 'Team name is required'}, status=400)
-            if not email_ids:
+            if not email_ids and filter_spec is None:
                 return JsonResponse({'error': 'No email IDs provided'}, status=400)
 
             valid_teams = ["Manager 1", "Manager 2"]  # Updated to match Team.TEAM_CHOICES
             if team_id not in valid_teams:
                 return JsonResponse({'error': f'Invalid team name. Must be one of {valid_teams}'}, status=400)
 
+            # A filter spec is resolved here, so the browser never has to ship the id list
+            selected = select_admin_emails(filter_spec) if filter_spec is not None else AdminEmail.objects.filter(id__in=email_ids)
             team, created = Team.objects.get_or_create(name=team_id)
-            emails = AdminEmail.objects.filter(id__in=email_ids, team__isnull=True)
-            already_assigned = AdminEmail.objects.filter(id__in=email_ids).exclude(team__isnull=True)
+            emails = selected.filter(team__isnull=True)
+            already_assigned = selected.exclude(team__isnull=True)
 
-            logger.debug(f"Unassigned emails count: {emails.count()}, Already assigned count: {already_assigned.count()}")
             if not emails.exists() and already_assigned.exists():
                 logger.info(f"All selected emails already assigned to a team for team_id={team_id}")
                 return JsonResponse({'error': 'The emails were already assigned'}, status=400)
             elif not emails.exists():
                 return JsonResponse({'error': 'No valid unassigned emails found'}, status=400)
 
-            updated_count = 0
-            manager_count = 0
-            tl_count = 0
-            for email in emails:
-                # Check if gmail_id already exists in ManagerEmail
-                if ManagerEmail.objects.filter(gmail_id=email.gmail_id).exists():
-                    logger.warning(f"Email {email.gmail_id} already exists in ManagerEmail, skipping assignment")
-                    continue
-                if not email.team or email.team != team:
-                    # Copy to ManagerEmail for the team
-                    ManagerEmail.objects.create(
-                        gmail_id=email.gmail_id,
-                        password=email.password,
-                        recovery_email=email.recovery_email,
-                        two_fa_code=email.two_fa_code,
-                        two_fa_link=email.two_fa_link,
-                        provider=email.provider,
-                        status=email.status,
-                        problem_reason=email.problem_reason,
-                        last_checked=email.last_checked,
-                        last_login=email.last_login,
-                        closure_status=email.closure_status,
-                        closure_requested_at=email.closure_requested_at,
-                        price=email.price,
-                        notes=email.notes,
-                        created_at=email.created_at,
-                        team=team,
-                        code=email.code,
-                        file=email.file,
-                        source_file_id=email.source_file_id
-                    )
-                    manager_count += 1
-                    updated_count += 1
-
-            return JsonResponse({'message': f'Assigned or updated {updated_count} emails to {team_id}'})
+            counts = assign_to_team(selected if filter_spec is not None else email_ids, team)
+            message = f"Assigned or updated {counts['assigned']} emails to {team_id}"
+            if counts['skipped_present']:
+                message += f", {counts['skipped_present']} already in this team"
+            if counts['other_team']:
+                message += f", {counts['other_team']} already assigned to another team"
+            return JsonResponse({'message': message, **counts})
         except Team.DoesNotExist:
             logger.error(f"Team {team_id} does not exist")
             return JsonResponse({'error': f'Team "{team_id}" not found'}, status=400)
@@ -570,6 +572,8 @@ def assign_emails_to_team(request):
         except json.JSONDecodeError:
             logger.error(f"Invalid JSON data: {request.body}")
             return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+        except ValueError as ve:
+            return JsonResponse({'error': f'Invalid filter: {str(ve)}'}, status=400)
         except Exception as e:
             logger.error(f"Error assigning emails to team: {str(e)}")
             return JsonResponse({'error': str(e)}, status=500)
@@ -692,39 +696,46 @@ def import_tl_emails(request):
         logger.error(f"TL {request.user.username} not assigned to a team")
         return JsonResponse({'message': 'You are not assigned to a team. Please contact an admin.'}, status=403)
 
+    rejected = rejected_uploads(request) if request.method == 'POST' else []
+    if rejected:
+        return JsonResponse({'error': f'Error processing file: {UNSUPPORTED_FORMAT_MESSAGE}'}, status=400)
+
     if request.method == 'POST' and request.FILES.get('excel_file'):
         file = request.FILES['excel_file']
         try:
-            df = pd.read_excel(file, engine='openpyxl')
+            header, rows = read_upload(file, file.name, TL_IMPORT.header_keywords)
             updated_count = 0
             created_count = 0
 
-            for index, row in df.iterrows():
-                gmail_id = str(row.get('Gmail ID', '')).strip()
-                # Handle NaN for new_password, convert to empty string if missing
-                new_password = str(row.get('New Password', '')).strip() if pd.notna(row.get('New Password')) else ''
-                if not gmail_id:
-                    continue  # Skip rows with no Gmail ID
-
-                # Check if the email exists for the current TL and team
-                email = TLEmail.objects.filter(gmail_id=gmail_id, team=team, assigned_to=profile).first()
-                if email:
-                    # Update existing email if new_password differs
-                    if email.new_password != new_password:
-                        email.new_password = new_password
-                        email.save()
-                        updated_count += 1
-                        logger.info(f"Updated new_password for {gmail_id} by {request.user.username}")
-                else:
-                    # Create new email if it doesn't exist
-                    TLEmail.objects.create(
-                        gmail_id=gmail_id,
-                        new_password=new_password,
-                        team=team,
-                        assigned_to=profile
-                    )
-                    created_count += 1
-                    logger.info(f"Created new email {gmail_id} with new_password by {request.user.username}")
+            for batch in normalize_rows(header, rows, TL_IMPORT):
+                # Rows with no Gmail ID are already dropped; fetch the batch's existing emails in one query
+                existing = {
+                    email.gmail_id: email
+                    for email in TLEmail.objects.filter(gmail_id__in=list(batch['gmail_id']), team=team, assigned_to=profile)
+                }
+                with recount('tl', TLEmail.objects.filter(gmail_id__in=list(batch['gmail_id']))):
+                    for row in batch.records():
+                        gmail_id = row['gmail_id']
+                        new_password = row['new_password']
+
+                        email = existing.get(gmail_id)
+                        if email:
+                            # Update existing email if new_password differs
+                            if email.new_password != new_password:
+                                email.new_password = new_password
+                                email.save()
+                                updated_count += 1
+                                logger.info(f"Updated new_password for {gmail_id} by {request.user.username}")
+                        else:
+                            # Create new email if it doesn't exist
+                            existing[gmail_id] = TLEmail.objects.create(
+                                gmail_id=gmail_id,
+                                new_password=new_password,
+                                team=team,
+                                assigned_to=profile
+                            )
+                            created_count += 1
+                            logger.info(f"Created new email {gmail_id} with new_password by {request.user.username}")
 
             # Prepare response message
             message = "Successfully processed import."
@@ -739,18 +750,80 @@ def import_tl_emails(request):
             return JsonResponse({'error': f'Error processing file: {str(e)}'}, status=400)
 
     return JsonResponse({'error': 'Invalid request method'}, status=405)
+def _admin_files_etag(request):
+    # The files table holds one row per upload, so this aggregate stays tiny
+    marker = File.objects.aggregate(last=Max('id'), files=Count('id'), rows=Sum('count'))
+    return data_etag(request, 'admin_files_data', *marker.values())
+
 @require_GET
 @login_required
+@condition(etag_func=_admin_files_etag)
 def admin_files_data(request):
     files = File.objects.filter().values('id', 'file_name', 'date', 'count', 'source')
     return JsonResponse({'files': list(files)})
 
+@require_GET
+@login_required
+def import_jobs_status(request):
+    """Progress of queued imports, polled by the admin dashboard with ?ids=1&ids=2."""
+    if not request.user.userprofile.is_admin:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    job_ids = [job_id for job_id in request.GET.getlist('ids') if job_id.isdigit()]
+    jobs = list(ImportJob.objects.filter(id__in=job_ids).order_by('id').values(
+        'id', 'file_name', 'file_id', 'status', 'rows_parsed', 'rows_imported',
+        'rows_duplicated', 'rows_failed', 'error'
+    ))
+    return JsonResponse({
+        'jobs': jobs,
+        'finished': all(job['status'] in ('done', 'failed') for job in jobs)
+    })
+
+class _Echo:
+    """File-like object for csv.writer that hands each line back instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+@require_GET
+@login_required
+def import_job_duplicates(request, job_id):
+    """Download the duplicates an import skipped, streamed as CSV (default) or ?format=xlsx."""
+    if not request.user.userprofile.is_admin:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    job = get_object_or_404(ImportJob, id=job_id)
+    gmail_ids = ImportDuplicate.objects.filter(job=job).order_by('id').values_list('gmail_id', flat=True)
+    base_name = f'duplicates_{os.path.splitext(job.file_name)[0]}'
+
+    if request.GET.get('format') == 'xlsx':
+        # xlsx is a zip archive, so write rows to a temp file in constant memory and stream that
+        output = tempfile.TemporaryFile()
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        worksheet = workbook.add_worksheet('Duplicates')
+        worksheet.set_column(0, 0, 30)
+        worksheet.write(0, 0, 'Gmail ID', workbook.add_format({'bold': True}))
+        for row, gmail_id in enumerate(gmail_ids.iterator(chunk_size=2000), start=1):
+            worksheet.write_string(row, 0, gmail_id)
+        workbook.close()
+        output.seek(0)
+        return FileResponse(
+            output, as_attachment=True, filename=f'{base_name}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+
+    writer = csv.writer(_Echo())
+    lines = chain([writer.writerow(['Gmail ID'])], (writer.writerow([gmail_id]) for gmail_id in gmail_ids.iterator(chunk_size=2000)))
+    response = StreamingHttpResponse(lines, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{base_name}.csv"'
+    return response
+
 @require_POST
 @login_required
 def delete_file(request, file_id):
     try:
         file = File.objects.get(id=file_id)
-        AdminEmail.objects.filter(file=file).delete()  # Delete associated emails
+        delete_counted('admin', AdminEmail.objects.filter(file=file))  # Delete associated emails
         file.delete()
         return JsonResponse({'message': f'File ID {file_id} deleted successfully'})
     except File.DoesNotExist:
@@ -758,36 +831,43 @@ def delete_file(request, file_id):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
     
+def _admin_data_etag(request):
+    if not request.user.userprofile.is_admin:
+        return None
+    return data_etag(request, 'admin_dashboard_data', request_version(request, ADMIN_SCOPE))
+
 @require_GET
 @login_required
+@condition(etag_func=_admin_data_etag)
 def admin_dashboard_data(request):
     if not request.user.userprofile.is_admin:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
 
     page = request.GET.get('page', 1)
     search_id = request.GET.get('search_id', '')
-    per_page = 10
+    per_page = page_size(request)
+    columns = project(request, ('id', 'source_file_id', 'gmail_id', 'password', 'recovery_email', 'provider', 'price'))
     try:
         page = int(page)
         start = (page - 1) * per_page
         end = start + per_page
-        emails = AdminEmail.objects.values(
-            'id', 'source_file_id', 'gmail_id', 'password', 'recovery_email', 'provider', 'price'
-        ).order_by('source_file_id', 'id')
+        emails = AdminEmail.objects.values(*columns).order_by('source_file_id', 'id')
         
         if search_id and search_id.isdigit():
             emails = emails.filter(source_file_id=int(search_id))
             logger.info(f"Filtering emails by source_file_id={search_id}, query: {emails.query}")
+        if 'cursor' in request.GET:
+            return _cursor_page(request, emails, columns)
         
-        total = emails.count()
+        total = emails.count() if search_id and search_id.isdigit() else counted_total('admin')
         total_pages = math.ceil(total / per_page) if total > 0 else 1
         has_next = end < total
         has_prev = page > 1
         emails_list = list(emails[start:end])
         
-        logger.info(f"Admin dashboard data: total={total}, page={page}, search_id={search_id}, emails={emails_list}")
+        logger.info(f"Admin dashboard data: total={total}, page={page}, search_id={search_id}, rows={len(emails_list)}")
         return JsonResponse({
-            'emails': emails_list,
+            **encode_rows(request, emails_list, columns),
             'total': total,
             'current_page': page,
             'total_pages': total_pages,
@@ -802,7 +882,7 @@ def admin_dashboard_data(request):
 @login_required
 def delete_emails_by_source(request, file_id):
     if request.method == 'POST':
-        AdminEmail.objects.filter(source_file_id=file_id).delete()
+        delete_counted('admin', AdminEmail.objects.filter(source_file_id=file_id))
         return JsonResponse({'message': 'Emails deleted successfully'})
     return JsonResponse({'error': 'Invalid request method'}, status=405)
 
@@ -812,18 +892,14 @@ def update_team_email_status(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            statuses = data.get('statuses', {})
             profile = request.user.userprofile
             if profile.role != 'manager':
                 return JsonResponse({'error': 'Unauthorized to update statuses.'}, status=403)
-            team = profile.team
-            for email_id, status in statuses.items():
-                email = ManagerEmail.objects.get(id=email_id, team=team)
-                email.status = status
-                email.save()
-            return JsonResponse({'message': 'Statuses updated successfully'})
-        except ManagerEmail.DoesNotExist:
-            return JsonResponse({'error': 'Email not found or not authorized.'}, status=404)
+            groups, invalid = parse_status_map(data.get('statuses', {}), ManagerEmail)
+            counts = apply_statuses(ManagerEmail, groups, 'manager', changed_by=request.user, team=profile.team)
+            return JsonResponse({'message': 'Statuses updated successfully', 'invalid': invalid, **counts})
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON data'}, status=400)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
     return JsonResponse({'error': 'Invalid request method'}, status=405)
@@ -834,22 +910,45 @@ def update_tl_email_status(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            statuses = data.get('statuses', {})
             profile = request.user.userprofile
             if profile.role != 'tl':
                 return JsonResponse({'error': 'Unauthorized to update statuses.'}, status=403)
-            team = profile.team
-            for email_id, status in statuses.items():
-                email = TLEmail.objects.get(id=email_id, team=team, assigned_to=profile)
-                email.status = status
-                email.save()
-            return JsonResponse({'message': 'Statuses updated successfully'})
-        except TLEmail.DoesNotExist:
-            return JsonResponse({'error': 'Email not found or not authorized.'}, status=404)
+            groups, invalid = parse_status_map(data.get('statuses', {}), TLEmail)
+            counts = apply_statuses(TLEmail, groups, 'tl', changed_by=request.user, team=profile.team, assigned_to=profile)
+            if settings.PROPAGATE_STATUSES_ON_COMMIT and counts['updated']:
+                propagate_after_commit()
+            return JsonResponse({'message': 'Statuses updated successfully', 'invalid': invalid, **counts})
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON data'}, status=400)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
     return JsonResponse({'error': 'Invalid request method'}, status=405)
 
+@require_GET
+@login_required
+def status_events(request):
+    """
+    Status changes after ?since=<cursor>, oldest first, for incremental syncs.
+
+    Pass the returned ``next_cursor`` back as ``since`` until ``has_more`` is false.
+    Admins see every team; managers and TLs only their own. Optional ``stage`` and
+    ``limit`` (at most MAX_EVENTS_PAGE).
+    """
+    profile = request.user.userprofile
+    if not profile.is_admin and not profile.team:
+        return JsonResponse({'message': 'You are not assigned to a team.'}, status=403)
+
+    since = request.GET.get('since', '0')
+    limit = request.GET.get('limit', str(MAX_EVENTS_PAGE))
+    if not since.isdigit() or not limit.isdigit() or int(limit) < 1:
+        return JsonResponse({'error': 'since and limit must be non-negative integers'}, status=400)
+
+    events, next_cursor, has_more = events_since(
+        int(since), min(int(limit), MAX_EVENTS_PAGE), stage=request.GET.get('stage'),
+        team=None if profile.is_admin else profile.team
+    )
+    return JsonResponse({'events': events, 'next_cursor': next_cursor, 'has_more': has_more})
+
 @login_required
 @require_POST
 def assign_emails_to_tls(request):
@@ -865,79 +964,66 @@ def assign_emails_to_tls(request):
             return JsonResponse({'error': 'Manager is not assigned to a team.'}, status=400)
         logger.info(f"Processing for team: {team.name} (ID: {team.id})")
 
-        # Get all emails for the manager's team (not filtered by is_assigned)
-        all_emails = ManagerEmail.objects.filter(team=team)
-        logger.info(f"Found {all_emails.count()} emails for team {team.name}: {[email.gmail_id for email in all_emails]}")
-
-        if not all_emails.exists():
+        if not ManagerEmail.objects.filter(team=team).exists():
             logger.info(f"No emails available for team {team.name}")
             return JsonResponse({'message': 'No emails to assign.'})
 
         # Get all TLs for the team with their provider
-        tls = UserProfile.objects.filter(team=team, role='tl').select_related('user')
-        logger.info(f"Found {tls.count()} TLs for team {team.name}: {[tl.tl_provider for tl in tls if tl.tl_provider]}")
-        if not tls.exists():
+        tls = list(UserProfile.objects.filter(team=team, role='tl').select_related('user'))
+        logger.info(f"Found {len(tls)} TLs for team {team.name}: {[tl.tl_provider for tl in tls if tl.tl_provider]}")
+        if not tls:
             return JsonResponse({'error': 'No Team Leads found for this team.'}, status=400)
 
-        # Map TLs by provider
-        tl_by_provider = {tl.tl_provider.lower(): tl for tl in tls if tl.tl_provider}
-
-        assigned_count = 0
-        for email in all_emails:
-            provider = email.provider.lower() if email.provider else None
-            logger.info(f"Processing email {email.gmail_id} with provider {provider}, is_assigned={email.is_assigned}")
-            if provider and provider in tl_by_provider:
-                tl = tl_by_provider[provider]
-                # Check if gmail_id already exists in TLEmail for this team
-                if TLEmail.objects.filter(gmail_id=email.gmail_id, team=team).exists():
-                    logger.warning(f"Email {email.gmail_id} already assigned to a TL, skipping")
-                    continue
-                # Create TLEmail record for the TL
-                TLEmail.objects.create(
-                    gmail_id=email.gmail_id,
-                    password=email.password,
-                    recovery_email=email.recovery_email,
-                    two_fa_code=email.two_fa_code,
-                    two_fa_link=email.two_fa_link,
-                    provider=email.provider,
-                    status=email.status,
-                    problem_reason=email.problem_reason,
-                    last_checked=email.last_checked,
-                    last_login=email.last_login,
-                    closure_status=email.closure_status,
-                    closure_requested_at=email.closure_requested_at,
-                    new_password='',
-                    notes=email.notes,
-                    created_at=email.created_at,
-                    team=team,
-                    code=email.code,
-                    file=email.file,
-                    source_file_id=email.source_file_id,
-                    assigned_to=tl
-                )
-                # Mark the ManagerEmail as assigned
-                email.is_assigned = True
-                email.save()
-                assigned_count += 1
-                logger.info(f"Assigned {email.gmail_id} to TL {tl.user.username}")
-            else:
-                logger.warning(f"Skipping email {email.gmail_id} with provider {provider} - No matching TL")
-
-        if assigned_count > 0:
-            logger.info(f"Successfully assigned {assigned_count} emails to TLs for team {team.name}")
-            return JsonResponse({'message': f'Assigned or updated {assigned_count} emails to TLs'})
-        else:
-            # Check if all emails were skipped due to existing TLEmail records
-            all_skipped_due_to_assignment = all(TLEmail.objects.filter(gmail_id=email.gmail_id, team=team).exists() for email in all_emails)
-            if all_skipped_due_to_assignment and all_emails.exists():
-                logger.info(f"All emails for team {team.name} already assigned to TLs")
-                return JsonResponse({'error': 'The emails were already assigned'}, status=400)
-            logger.info(f"No emails assigned for team {team.name} due to provider mismatch or no TLs")
-            return JsonResponse({'message': 'No emails were assigned (no matching TLs for providers or all already assigned).'})
+        # Spread work over every TL of each provider by weight, capacity and open load
+        counts = assign_to_tls(team, TLScheduler(tls))
+        if counts['assigned'] > 0:
+            logger.info(f"Successfully assigned {counts['assigned']} emails to TLs for team {team.name}")
+            return JsonResponse({'message': f"Assigned or updated {counts['assigned']} emails to TLs", **counts})
+        elif counts['no_tl'] == 0 and counts['at_capacity'] == 0:
+            # Nothing new to hand out: every email is already with a TL
+            logger.info(f"All emails for team {team.name} already assigned to TLs")
+            return JsonResponse({'error': 'The emails were already assigned'}, status=400)
+        logger.info(f"No emails assigned for team {team.name} due to provider mismatch, full TLs or no TLs")
+        return JsonResponse({'message': 'No emails were assigned (no matching TLs for providers, TLs at capacity or all already assigned).', **counts})
     except Exception as e:
         logger.error(f"Error assigning emails to TLs: {str(e)}")
         return JsonResponse({'error': f'An error occurred during assignment: {str(e)}'}, status=500)
 
+CLAIM_DEFAULT = 50
+CLAIM_MAX = 500
+
+@login_required
+@require_POST
+def claim_tl_emails(request):
+    """Pull the next ``count`` unassigned emails of the TL's team and provider."""
+    profile = request.user.userprofile
+    if not profile or profile.is_admin or profile.role != 'tl':
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    if not profile.team:
+        return JsonResponse({'message': 'You are not assigned to a team. Please contact an admin.'}, status=403)
+    if not profile.tl_provider:
+        return JsonResponse({'error': 'No provider is set for this TL.'}, status=400)
+
+    try:
+        data = json.loads(request.body or '{}')
+        count = min(int(data.get('count', CLAIM_DEFAULT)), CLAIM_MAX)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    if count <= 0:
+        return JsonResponse({'error': 'count must be a positive number'}, status=400)
+
+    try:
+        claimed = claim_for_tl(profile, count)
+    except Exception as e:
+        logger.error(f"Error claiming emails for TL {request.user.username}: {str(e)}")
+        return JsonResponse({'error': f'An error occurred while claiming emails: {str(e)}'}, status=500)
+
+    return JsonResponse({
+        'message': f'Claimed {len(claimed)} email(s).' if claimed else 'No emails left to claim.',
+        'claimed': len(claimed),
+        'emails': [{'id': email.id, 'gmail_id': email.gmail_id} for email in claimed]
+    })
+
 @login_required
 def delete_all_tl_emails(request):
     profile = request.user.userprofile
@@ -951,7 +1037,7 @@ def delete_all_tl_emails(request):
         return JsonResponse({'message': 'You are not assigned to a team. Please contact an admin.'}, status=403)
 
     try:
-        emails_deleted = TLEmail.objects.filter(assigned_to=profile, team=team).delete()
+        emails_deleted = delete_counted('tl', TLEmail.objects.filter(assigned_to=profile, team=team))
         if emails_deleted[0] > 0:
             logger.info(f"Deleted {emails_deleted[0]} emails for TL {request.user.username}")
             return JsonResponse({'message': f'Successfully deleted {emails_deleted[0]} email(s).'})
@@ -971,83 +1057,66 @@ def closed_emails_page(request):
     if not team:
         return JsonResponse({'message': 'You are not assigned to a team.'}, status=403)
 
+    rejected = rejected_uploads(request) if request.method == 'POST' else []
+    if rejected:
+        logger.error(f"Validation error processing file {rejected[0]}: unsupported format")
+        return JsonResponse({'error': f'Validation error with file {rejected[0]}: {UNSUPPORTED_FORMAT_MESSAGE}'}, status=400)
+
     if request.method == 'POST' and request.FILES.get('closed_file'):
         file = request.FILES['closed_file']
         try:
-            os.makedirs('uploads', exist_ok=True)
-            file_path = os.path.join('uploads', file.name)
-            with open(file_path, 'wb+') as destination:
-                for chunk in file.chunks():
-                    destination.write(chunk)
-
-            if not file.name.lower().endswith(('.xlsx', '.xls')):
-                raise ValueError("Unsupported file format. Please upload Excel files (.xlsx or .xls).")
-
-            df_try = pd.read_excel(file_path, header=0, engine='openpyxl')
-            header_keywords = ['gmail', 'email', 'gmail_id', 'password', 'recover', 'new_password']
-            has_header = any(str(col).lower() in header_keywords for col in df_try.columns)
-            logger.debug(f"Detected columns: {df_try.columns}, has_header: {has_header}")
-
-            if has_header:
-                df = df_try
-            else:
-                df = pd.read_excel(file_path, header=None, engine='openpyxl')
+            # Parsed straight from the upload: in memory, or Django's private temp file for large files
+            header, rows = read_upload(file, file.name, CLOSED_IMPORT.header_keywords)
+            logger.debug(f"Detected header: {header}")
 
             imported_count = 0
             skipped_count = 0
-            for index, row in df.iterrows():
-                email_data = {}
-                try:
-                    if has_header:
-                        for col in df.columns:
-                            value = str(row.get(col, '')).strip() if pd.notna(row.get(col)) else ''
-                            col_lower = str(col).lower()
-                            if 'gmail' in col_lower:
-                                email_data['gmail_id'] = value
-                            elif 'pass' in col_lower:
-                                email_data['password'] = value
-                            elif 'recover' in col_lower:
-                                email_data['recovery_email'] = value
-                            elif 'new_pass' in col_lower:
-                                email_data['new_password'] = value
-                    else:
-                        email_data = {
-                            'gmail_id': str(row[0]).strip() if pd.notna(row[0]) else '',
-                            'password': str(row[1]).strip() if len(row) > 1 and pd.notna(row[1]) else '',
-                            'recovery_email': str(row[2]).strip() if len(row) > 2 and pd.notna(row[2]) else '',
-                            'new_password': str(row[3]).strip() if len(row) > 3 and pd.notna(row[3]) else '',
-                        }
-
-                    gmail_id = email_data.get('gmail_id')
-                    if gmail_id:
-                        logger.debug(f"Processing gmail_id: {gmail_id}")
-                        existing_email = ClosedEmail.objects.filter(gmail_id=gmail_id).first()
-                        if existing_email and existing_email.assigned_to != profile.user:
-                            skipped_count += 1
-                            logger.debug(f"Skipped {gmail_id}, already assigned to another user")
-                            continue
-                        email, created = ClosedEmail.objects.update_or_create(
-                            gmail_id=gmail_id,
-                            defaults={
-                                'password': email_data.get('password', ''),
-                                'recovery_email': email_data.get('recovery_email'),
-                                'new_password': email_data.get('new_password', ''),
-                                'status': 'pending_closed',
-                                'team': team,
-                                'assigned_to': profile.user
-                            }
-                        )
-                        if created or email.status != 'pending_closed':
-                            email.status = 'pending_closed'
-                            email.save()
-                            imported_count += 1
-                            logger.debug(f"Successfully processed {gmail_id}")
-                        else:
-                            logger.debug(f"Skipped {gmail_id}, already pending_closed")
-                except Exception as inner_e:
-                    logger.warning(f"Skipping row {index} in {file.name} due to error: {inner_e}")
-                    continue
+            events = []
+            # Every row written ends up assigned to this user, so their rows bound the recount
+            with recount('closed', ClosedEmail.objects.filter(assigned_to=profile.user)):
+                for email_data in (row for batch in normalize_rows(header, rows, CLOSED_IMPORT) for row in batch.records()):
+                    event = None
+                    try:
+                        with transaction.atomic():  # A failing row only rolls back itself
+                            gmail_id = email_data.get('gmail_id')
+                            if gmail_id:
+                                logger.debug(f"Processing gmail_id: {gmail_id}")
+                                existing_email = ClosedEmail.objects.filter(gmail_id=gmail_id).first()
+                                if existing_email and existing_email.assigned_to != profile.user:
+                                    skipped_count += 1
+                                    logger.debug(f"Skipped {gmail_id}, already assigned to another user")
+                                    continue
+                                email, created = ClosedEmail.objects.update_or_create(
+                                    gmail_id=gmail_id,
+                                    defaults={
+                                        'password': email_data.get('password', ''),
+                                        'recovery_email': email_data.get('recovery_email'),
+                                        'new_password': email_data.get('new_password', ''),
+                                        'status': 'pending_closed',
+                                        'team': team,
+                                        'assigned_to': profile.user
+                                    }
+                                )
+                                old_status = existing_email.status if existing_email else None
+                                if old_status != 'pending_closed':
+                                    event = StatusEvent(
+                                        stage='closed', email_id=email.id, gmail_id=gmail_id, team=team,
+                                        old_status=old_status, new_status='pending_closed', changed_by=request.user
+                                    )
+                                if created or email.status != 'pending_closed':
+                                    email.status = 'pending_closed'
+                                    email.save()
+                                    imported_count += 1
+                                    logger.debug(f"Successfully processed {gmail_id}")
+                                else:
+                                    logger.debug(f"Skipped {gmail_id}, already pending_closed")
+                    except Exception as inner_e:
+                        logger.warning(f"Skipping {email_data.get('gmail_id')} in {file.name} due to error: {inner_e}")
+                        continue
+                    if event is not None:
+                        events.append(event)  # Only once the row's savepoint has committed
 
+                record_status_events(events)
             message = f'Processed {imported_count} email(s) as pending_closed.'
             if skipped_count > 0:
                 message += f' {skipped_count} email(s) were already uploaded by another user and skipped.'
@@ -1058,9 +1127,6 @@ def closed_emails_page(request):
         except Exception as e:
             logger.error(f"Error processing file {file.name}: {str(e)}")
             return JsonResponse({'error': f'Error processing file {file.name}: {str(e)}'}, status=500)
-        finally:
-            if os.path.exists(file_path):
-                os.remove(file_path)
 
     # Render different templates based on role
     template = 'dashboard/closed_emails.html' if profile.role == 'tl' else 'dashboard/manager_closed_emails.html'
@@ -1079,16 +1145,24 @@ def closed_emails_data(request):
         logger.error("No team assigned to profile")
         return JsonResponse({'message': 'You are not assigned to a team.'}, status=403)
 
+    columns = project(request, ('id', 'source_file_id', 'gmail_id', 'password', 'recovery_email', 'new_password', 'status'))
+    if 'cursor' in request.GET:
+        return _cursor_page(
+            request,
+            ClosedEmail.objects.filter(team=team, assigned_to=profile.user, status__in=['pending_closed', 'closed']).values(*columns),
+            columns
+        )
+
     page = request.GET.get('page', 1)
-    per_page = 10
+    per_page = page_size(request)
     start = (int(page) - 1) * per_page
     end = start + per_page
     try:
         emails = ClosedEmail.objects.filter(team=team, assigned_to=profile.user, status__in=['pending_closed', 'closed']).values(
-            'id', 'source_file_id', 'gmail_id', 'password', 'recovery_email', 'new_password', 'status'
-        )[start:end]
+            *columns
+        ).order_by('source_file_id', 'id')[start:end]
         logger.debug(f"Fetched emails: {list(emails)}")
-        total = ClosedEmail.objects.filter(team=team, assigned_to=profile.user, status__in=['pending_closed', 'closed']).count()
+        total = counted_total('closed', team=team, assignee=profile, status=['pending_closed', 'closed'])
         logger.debug(f"Total emails count: {total}")
         total_pages = (total + per_page - 1) // per_page
         logger.debug(f"Total pages: {total_pages}")
@@ -1097,7 +1171,7 @@ def closed_emails_data(request):
         return JsonResponse({'error': 'An error occurred while fetching emails.'}, status=500)
 
     return JsonResponse({
-        'emails': list(emails),
+        **encode_rows(request, list(emails), columns),
         'current_page': int(page),
         'total_pages': total_pages,
         'has_prev': int(page) > 1,
@@ -1113,7 +1187,7 @@ def delete_closed_email(request, email_id):
 
     try:
         email = ClosedEmail.objects.get(id=email_id, assigned_to=profile.user)
-        email.delete()
+        delete_counted('closed', ClosedEmail.objects.filter(id=email.id))
         logger.info(f"Deleted email {email.gmail_id} by {request.user.username}")
         return JsonResponse({'message': 'Closed email deleted successfully.'})
     except ClosedEmail.DoesNotExist:
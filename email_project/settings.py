@@ -89,6 +89,25 @@ DATABASES = {
     'default': dj_database_url.config(default=os.environ.get("DATABASE_URL"), conn_max_age=600)
 }
 
+# Cached team/TL dashboard pages, keyed by per-team versions kept in the database (see
+# dashboard/versions.py). The local-memory cache is per process, so each worker warms its own
+# pages; set DASHBOARD_CACHE_BACKEND=file to share one cache between worker processes.
+DASHBOARD_CACHE_BACKEND = os.environ.get("DASHBOARD_CACHE_BACKEND", "locmem")
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get("DASHBOARD_CACHE_TIMEOUT", "300"))
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'dashboard': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get("DASHBOARD_CACHE_DIR", str(BASE_DIR / "cache" / "dashboard")),
+        'TIMEOUT': None,
+    } if DASHBOARD_CACHE_BACKEND == 'file' else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard',
+        'TIMEOUT': None,
+    },
+}
+
 
 
 # Password validation
@@ -130,6 +149,37 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / "dashboard/static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Uploaded spreadsheets waiting for the import worker (python manage.py run_import_worker)
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Uploads are parsed straight from Django's UploadedFile: kept in memory up to this
+# size, spooled to a private (0600) temp file above it. Unsupported extensions are
+# rejected by the first handler before any bytes are buffered, and a SHA-256 of
+# each file is computed as it streams in.
+FILE_UPLOAD_HANDLERS = [
+    'dashboard.uploads.ExtensionCheckUploadHandler',
+    'dashboard.uploads.ChecksumUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get("FILE_UPLOAD_MAX_MEMORY_SIZE", str(10 * 1024 * 1024)))
+FILE_UPLOAD_PERMISSIONS = 0o600
+FILE_UPLOAD_DIRECTORY_PERMISSIONS = 0o700
+
+# Parser processes per worker (0 = one per CPU) and max files claimed per round
+IMPORT_WORKER_PROCESSES = int(os.environ.get("IMPORT_WORKER_PROCESSES", "0"))
+IMPORT_WORKER_BATCH = int(os.environ.get("IMPORT_WORKER_BATCH", "16"))
+# Seconds after which a running job is taken to belong to a crashed worker and is failed;
+# keep it above the longest import
+IMPORT_JOB_TIMEOUT = int(os.environ.get("IMPORT_JOB_TIMEOUT", "3600"))
+
+# Push TL status saves on to the manager and admin rows as soon as they commit;
+# otherwise run `manage.py propagate_statuses` on a schedule
+PROPAGATE_STATUSES_ON_COMMIT = os.environ.get("PROPAGATE_STATUSES_ON_COMMIT", "False") == "True"
+# Status events younger than this many seconds are read again by the next propagation run,
+# so one whose transaction committed after a later event's is not skipped
+PROPAGATION_SETTLE_SECONDS = int(os.environ.get("PROPAGATION_SETTLE_SECONDS", "300"))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 